@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+import metrics
+from bnpl.features import age_from_dob, bucket_price
+from bnpl.schemas import BNPLRankingsResponse
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def profile_fingerprint(profile) -> str:
+    """
+    Stable digest of the profile fields that feed the ranking prompt.
+
+    Because the cache key is derived from these fields rather than the user id,
+    a profile edit changes the key and old entries can no longer be served to
+    that user; they simply age out through TTL/LRU eviction.
+    """
+    parts = (
+        str(age_from_dob(profile.dob)),
+        profile.job_title.strip().lower(),
+        f"{profile.monthly_income:.2f}",
+        f"{profile.monthly_expenses:.2f}",
+    )
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:32]
+
+
+def ranking_cache_key(profile, product_price: float, catalog_version: str) -> str:
+    return f"{catalog_version}:{profile_fingerprint(profile)}:{bucket_price(product_price)}"
+
+
+class RankingCache(ABC):
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[BNPLRankingsResponse]:
+        """
+        Return the cached rankings for the key, or None if absent or expired.
+        """
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: BNPLRankingsResponse) -> None:
+        """
+        Store rankings under the key for BNPL_CACHE_TTL_SECONDS.
+        """
+        pass
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class InMemoryRankingCache(RankingCache):
+    """
+    Per-process TTL + LRU cache bounded both by entry count and by the total
+    size of the serialized rankings it holds.
+    """
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: int, max_entries: int, max_bytes: int):
+        super().__init__()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    async def get(self, key: str) -> Optional[BNPLRankingsResponse]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.monotonic():
+            self._discard(key)
+            self.expirations += 1
+            entry = None
+        self._record(entry is not None)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return BNPLRankingsResponse.model_validate_json(entry[1])
+
+    async def set(self, key: str, value: BNPLRankingsResponse) -> None:
+        payload = value.model_dump_json()
+        if len(payload) > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, payload)
+        self._bytes += len(payload)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.evictions += 1
+
+    def _discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats.update({
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        })
+        return stats
+
+
+class RedisRankingCache(RankingCache):
+    """
+    Shared cache for multi-worker deployments. Expiry is delegated to Redis
+    key TTLs and the memory bound to the server's maxmemory policy.
+    """
+    backend = "redis"
+    prefix = "bnpl:rankings:"
+
+    def __init__(self, redis_url: str, ttl_seconds: int):
+        import redis.asyncio as redis
+        super().__init__()
+        self.client = redis.from_url(redis_url)
+        self.ttl_seconds = ttl_seconds
+
+    async def get(self, key: str) -> Optional[BNPLRankingsResponse]:
+        payload = await self.client.get(self.prefix + key)
+        self._record(payload is not None)
+        if payload is None:
+            return None
+        return BNPLRankingsResponse.model_validate_json(payload)
+
+    async def set(self, key: str, value: BNPLRankingsResponse) -> None:
+        await self.client.set(self.prefix + key, value.model_dump_json(), ex=self.ttl_seconds)
+
+
+def build_ranking_cache() -> RankingCache:
+    if settings.BNPL_CACHE_BACKEND == "redis":
+        if settings.REDIS_URL:
+            return RedisRankingCache(settings.REDIS_URL, settings.BNPL_CACHE_TTL_SECONDS)
+        logger.warning("BNPL_CACHE_BACKEND is redis but REDIS_URL is not set; using the memory backend")
+    return InMemoryRankingCache(
+        settings.BNPL_CACHE_TTL_SECONDS,
+        settings.BNPL_CACHE_MAX_ENTRIES,
+        settings.BNPL_CACHE_MAX_BYTES,
+    )
+
+
+ranking_cache = build_ranking_cache()
+metrics.register("bnpl_ranking_cache", ranking_cache.stats)
@@ -0,0 +1,138 @@
+"""
+Versioned BNPL provider-terms catalog.
+
+The provider terms, engine rules and static prompt text live in a JSON data
+file loaded once at startup. Everything that does not depend on the user is
+rendered (and token-counted) when the catalog is built, so a request only
+fills in the user-details section. A watcher swaps in a freshly built catalog
+when the file changes; readers take one reference to ``catalog_store.current``
+and use it for the whole request, so they never see a half-loaded catalog.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from pydantic import BaseModel
+
+import metrics
+from bnpl.engine import ProviderRules
+from config import settings
+from workers.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CATALOG_PATH = Path(__file__).with_name("provider_terms.json")
+
+
+class ProviderTerms(BaseModel):
+    name: str
+    summary: List[str]
+    terms: List[Tuple[str, str]]
+    # ProviderRules fields other than the name
+    rules: dict
+
+
+class CatalogData(BaseModel):
+    version: str
+    intro: str
+    providers: List[ProviderTerms]
+    evaluation_criteria: List[Tuple[str, str]]
+    instructions: List[str]
+
+
+def count_tokens(text: str) -> int:
+    try:
+        import tiktoken
+    except ImportError:
+        # Rough estimate for English prose when tiktoken is not installed
+        return len(text) // 4
+    return len(tiktoken.encoding_for_model("gpt-3.5-turbo").encode(text))
+
+
+class Catalog:
+    def __init__(self, data: CatalogData):
+        self.version = data.version
+        self.rules = [ProviderRules(name=provider.name, **provider.rules)
+                      for provider in data.providers]
+
+        providers = "\n\n".join(
+            f"{provider.name}:\n" + "\n".join(f"- {line}" for line in provider.summary)
+            for provider in data.providers
+        )
+        highlights = "\n\n".join(
+            f"**{provider.name}:**\n"
+            + "\n".join(f"- **{title}:** {text}" for title, text in provider.terms)
+            for provider in data.providers
+        )
+        criteria = "\n".join(
+            f"{number}. **{title}:** {text}"
+            for number, (title, text) in enumerate(data.evaluation_criteria, start=1)
+        )
+        self.prompt_prefix = f"{data.intro}\n\n### User Details:\n"
+        self.prompt_suffix = (
+            f"\n### BNPL Providers:\n{providers}\n\n"
+            f"### Provider Terms Highlights:\n\n{highlights}\n\n"
+            f"#### Evaluation Criteria:\n{criteria}\n\n"
+            "#### Instructions:\n" + "\n".join(data.instructions) + "\n"
+        )
+        self.static_prompt_tokens = count_tokens(self.prompt_prefix + self.prompt_suffix)
+
+    def render_prompt(self, customer_profile: dict) -> str:
+        user_details = (
+            f"- Age: {customer_profile['age']}\n"
+            f"- Occupation: {customer_profile['occupation']}\n"
+            f"- Monthly Income: ${customer_profile['monthly_income']}\n"
+            f"- Monthly Expenses: ${customer_profile['monthly_expenses']}\n"
+            f"- Product Price: ${customer_profile['product_price']}\n"
+        )
+        return self.prompt_prefix + user_details + self.prompt_suffix
+
+
+def load_catalog(path: Path) -> Catalog:
+    with open(path, encoding="utf-8") as f:
+        return Catalog(CatalogData.model_validate(json.load(f)))
+
+
+class CatalogStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self.current = load_catalog(path)
+        self._mtime = os.stat(path).st_mtime
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self.reload_failures = 0
+
+    async def reload_if_changed(self) -> None:
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return
+        self._mtime = mtime
+        try:
+            catalog = load_catalog(self.path)
+        except Exception:
+            # Keep serving the previous catalog until the file is fixed
+            self.reload_failures += 1
+            logger.exception("Failed to reload BNPL catalog from %s", self.path)
+            return
+        self.current = catalog
+        self.loaded_at = time.time()
+        self.reloads += 1
+        logger.info("Loaded BNPL catalog version %s", catalog.version)
+
+    def stats(self) -> dict:
+        return {
+            "version": self.current.version,
+            "static_prompt_tokens": self.current.static_prompt_tokens,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "reload_failures": self.reload_failures,
+        }
+
+
+catalog_store = CatalogStore(Path(settings.BNPL_CATALOG_PATH or DEFAULT_CATALOG_PATH))
+catalog_watcher = PeriodicTask(
+    "bnpl-catalog-reload", settings.BNPL_CATALOG_RELOAD_SECONDS, catalog_store.reload_if_changed)
+metrics.register("bnpl_catalog", catalog_store.stats)
@@ -0,0 +1,117 @@
+"""
+Rule-based BNPL scoring engine.
+
+Scores every provider from the profile and price in a single deterministic
+pass, using the structured rules shipped in the provider-terms catalog. Used as the fast path,
+and as the fallback when the LLM does not answer in time.
+"""
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from bnpl.schemas import BNPLRanking, BNPLRankingsResponse
+
+# Relative weights of the evaluation criteria used in the LLM prompt.
+APPROVAL_WEIGHT = 0.45
+COST_WEIGHT = 0.35
+BENEFIT_WEIGHT = 0.10
+FLEXIBILITY_WEIGHT = 0.10
+STRICT_CREDIT_CHECK_PENALTY = 0.8
+
+
+class ProviderRules(BaseModel):
+    name: str
+    min_age: int = 18
+    residency: str
+    installments: int
+    installment_interval_days: int
+    apr_min: float = 0.0
+    apr_max: float = 0.0
+    late_fee: float = 0.0
+    # Orders at or above this price may incur a second late fee
+    second_late_fee_threshold: Optional[float] = None
+    late_fee_cap: Optional[float] = None
+    late_fee_cap_ratio: Optional[float] = None
+    strict_credit_check: bool = False
+    cashback_rate: float = 0.0
+    perks: str = ""
+
+
+def _clamp(value: float, low: float = 0.0, high: float = 1.0) -> float:
+    return max(low, min(high, value))
+
+
+def _installment(rules: ProviderRules, price: float, apr: float) -> float:
+    if apr <= 0:
+        return price / rules.installments
+    rate = apr * rules.installment_interval_days / 365
+    return price * rate / (1 - (1 + rate) ** -rules.installments)
+
+
+def _max_late_fees(rules: ProviderRules, price: float) -> float:
+    fees = rules.late_fee
+    if rules.second_late_fee_threshold is not None and price >= rules.second_late_fee_threshold:
+        fees *= 2
+    if rules.late_fee_cap is not None:
+        fees = min(fees, rules.late_fee_cap)
+    if rules.late_fee_cap_ratio is not None:
+        fees = min(fees, price * rules.late_fee_cap_ratio)
+    return fees
+
+
+def _score(rules: ProviderRules, age: int, monthly_income: float,
+           monthly_expenses: float, price: float) -> tuple:
+    disposable = max(monthly_income - monthly_expenses, 0.0)
+    # Lower headroom pushes a credit-scored provider towards its top APR.
+    headroom = disposable / monthly_income if monthly_income > 0 else 0.0
+    apr = rules.apr_max - (rules.apr_max - rules.apr_min) * _clamp(headroom * 2)
+    payment = _installment(rules, price, apr)
+    payments_per_month = 30 / rules.installment_interval_days
+    burden = payment * payments_per_month / disposable if disposable > 0 else float("inf")
+
+    approval = 0.0 if age < rules.min_age else _clamp(1 - burden)
+    if rules.strict_credit_check:
+        approval *= STRICT_CREDIT_CHECK_PENALTY
+    interest = payment * rules.installments - price
+    expected_fees = _max_late_fees(rules, price) * _clamp(burden)
+    total_cost = interest + expected_fees
+    cost_score = 1 - _clamp(total_cost / price) if price > 0 else 1.0
+    flexibility = _clamp(rules.installments / 12)
+
+    score = (APPROVAL_WEIGHT * approval + COST_WEIGHT * cost_score
+             + BENEFIT_WEIGHT * _clamp(rules.cashback_rate * 50)
+             + FLEXIBILITY_WEIGHT * flexibility)
+    return score, approval, apr, payment, burden, total_cost
+
+
+def score_providers(providers: List[ProviderRules], age: int, monthly_income: float,
+                    monthly_expenses: float, product_price: float) -> BNPLRankingsResponse:
+    scored = []
+    for rules in providers:
+        score, approval, apr, payment, burden, total_cost = _score(
+            rules, age, monthly_income, monthly_expenses, product_price)
+
+        if apr > 0:
+            highlight = f"{apr:.0%} APR, {rules.installments} payments of ${payment:.2f}"
+        else:
+            highlight = f"0% Interest, {rules.installments} payments of ${payment:.2f}"
+        if rules.cashback_rate:
+            highlight += f" + {rules.cashback_rate:.0%} cashback"
+
+        if age < rules.min_age:
+            approval_text = f"Not eligible: {rules.name} requires applicants aged {rules.min_age}+."
+        elif burden == float("inf"):
+            approval_text = "Approval unlikely: no disposable monthly income to cover repayments."
+        else:
+            approval_text = (f"Estimated approval likelihood {approval:.0%}; repayments take "
+                             f"{burden:.0%} of monthly disposable income.")
+        reasoning = (f"{approval_text} Estimated total cost of credit including likely fees is "
+                     f"${total_cost:.2f}. {rules.name} {rules.perks}; available to "
+                     f"{rules.residency} residents.")
+        scored.append((score, rules.name, highlight, reasoning))
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return BNPLRankingsResponse(rankings=[
+        BNPLRanking(rank=rank, provider=name, highlight=highlight, reasoning=reasoning)
+        for rank, (_, name, highlight, reasoning) in enumerate(scored, start=1)
+    ])
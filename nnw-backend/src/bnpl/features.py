@@ -0,0 +1,23 @@
+import math
+from datetime import date
+from typing import Optional
+
+from config import settings
+
+
+def age_from_dob(dob: date, today: Optional[date] = None) -> int:
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+def bucket_price(product_price: float) -> int:
+    """Index of the BNPL_PRICE_BUCKET-wide price band the price falls into."""
+    return math.floor(product_price / settings.BNPL_PRICE_BUCKET)
+
+
+def representative_price(product_price: float) -> float:
+    """
+    Midpoint of the price's band. Rankings are computed for this price, so a
+    cached ranking holds for every price in the band.
+    """
+    return (bucket_price(product_price) + 0.5) * settings.BNPL_PRICE_BUCKET
@@ -0,0 +1,67 @@
+from typing import AsyncIterator
+
+import openai
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from bnpl.features import age_from_dob
+from bnpl.schemas import BNPLRankingsResponse
+from config import settings
+from models.profile import Profile
+
+# Load OpenAI API Key
+openai.api_key = settings.OPENAI_API_KEY
+if settings.OPENAI_API_BASE:
+    openai.api_base = settings.OPENAI_API_BASE
+
+
+def build_customer_profile(profile: Profile, product_price: float) -> dict:
+    # Map profile data to the expected customer profile fields in the prompt
+    return {
+        'name': profile.name,
+        'age': age_from_dob(profile.dob),
+        'occupation': profile.job_title,
+        'monthly_income': profile.monthly_income,
+        'monthly_expenses': profile.monthly_expenses,
+        'product_price': product_price,
+    }
+
+
+def _completion_kwargs(prompt: str) -> dict:
+    return dict(
+        model="gpt-3.5-turbo",
+        messages=[{"role": "system", "content": "You are a financial advisor that evaluates BNPL (Buy Now, Pay Later) options for users."},
+                  {"role": "user", "content": prompt}],
+        temperature=0.7
+    )
+
+
+async def request_llm_rankings(prompt: str) -> BNPLRankingsResponse:
+    # Call OpenAI API
+    try:
+        response = await openai.ChatCompletion.acreate(**_completion_kwargs(prompt))
+        ai_suggestion = response["choices"][0]["message"]["content"]
+
+        # Parse the LLM response into the Pydantic model
+        try:
+            bnpl_rankings = BNPLRankingsResponse.model_validate_json(
+                ai_suggestion)
+        except ValidationError as ve:
+            raise HTTPException(
+                status_code=500, detail=f"Validation Error: {ve}")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OpenAI Error: {str(e)}")
+
+    return bnpl_rankings
+
+
+async def stream_llm_content(prompt: str) -> AsyncIterator[str]:
+    """
+    Yield the completion text piece by piece as the model generates it.
+    """
+    response = await openai.ChatCompletion.acreate(stream=True, **_completion_kwargs(prompt))
+    async for chunk in response:
+        content = chunk["choices"][0]["delta"].get("content")
+        if content:
+            yield content
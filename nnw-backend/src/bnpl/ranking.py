@@ -0,0 +1,93 @@
+import asyncio
+import logging
+
+import metrics
+from bnpl.cache import ranking_cache, ranking_cache_key
+from bnpl.catalog import Catalog, catalog_store
+from bnpl.engine import score_providers
+from bnpl.features import age_from_dob, representative_price
+from bnpl.llm import build_customer_profile, request_llm_rankings
+from bnpl.schemas import BNPLRankingsResponse
+from bnpl.single_flight import ranking_flight
+from config import settings
+from models.profile import Profile
+
+logger = logging.getLogger(__name__)
+
+ENGINE_MODE = "engine"
+LLM_MODE = "llm"
+HYBRID_MODE = "hybrid"
+
+_stats = {"engine_rankings": 0, "llm_timeouts": 0, "background_enrichments": 0}
+# Strong references so background enrichment tasks are not garbage collected
+_background_tasks = set()
+
+
+def rank_with_engine(profile: Profile, product_price: float, catalog: Catalog) -> BNPLRankingsResponse:
+    _stats["engine_rankings"] += 1
+    bnpl_rankings = score_providers(
+        catalog.rules,
+        age_from_dob(profile.dob),
+        profile.monthly_income,
+        profile.monthly_expenses,
+        product_price,
+    )
+    bnpl_rankings.catalog_version = catalog.version
+    return bnpl_rankings
+
+
+async def _rank_with_llm(cache_key: str, customer_profile: dict, catalog: Catalog) -> BNPLRankingsResponse:
+    bnpl_rankings = await request_llm_rankings(catalog.render_prompt(customer_profile))
+    bnpl_rankings.catalog_version = catalog.version
+    await ranking_cache.set(cache_key, bnpl_rankings)
+    return bnpl_rankings
+
+
+def _enrich_in_background(flight) -> None:
+    task = asyncio.ensure_future(flight)
+    _background_tasks.add(task)
+    _stats["background_enrichments"] += 1
+
+    def done(t: asyncio.Future) -> None:
+        _background_tasks.discard(t)
+        if not t.cancelled() and t.exception() is not None:
+            logger.warning("Background BNPL enrichment failed: %s", t.exception())
+
+    task.add_done_callback(done)
+
+
+async def rank_profile(profile: Profile, product_price: float, mode: str = None) -> BNPLRankingsResponse:
+    mode = mode or settings.BNPL_RANKING_MODE
+    catalog = catalog_store.current
+    # Ranked for the band's price, like the cached rankings it is keyed with
+    product_price = representative_price(product_price)
+    if mode == ENGINE_MODE:
+        return rank_with_engine(profile, product_price, catalog)
+
+    cache_key = ranking_cache_key(profile, product_price, catalog.version)
+    cached = await ranking_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    # Concurrent requests for the same prompt key share one upstream call
+    customer_profile = build_customer_profile(profile, product_price)
+    flight = ranking_flight.do(
+        cache_key, lambda: _rank_with_llm(cache_key, customer_profile, catalog))
+
+    if mode == HYBRID_MODE:
+        _enrich_in_background(flight)
+        return rank_with_engine(profile, product_price, catalog)
+
+    try:
+        # The shared call keeps running after a timeout and still fills the cache.
+        return await asyncio.wait_for(flight, settings.OPENAI_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        _stats["llm_timeouts"] += 1
+        return rank_with_engine(profile, product_price, catalog)
+
+
+def stats() -> dict:
+    return dict(_stats, mode=settings.BNPL_RANKING_MODE)
+
+
+metrics.register("bnpl_ranking", stats)
@@ -0,0 +1,14 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class BNPLRanking(BaseModel):
+    rank: int
+    provider: str
+    highlight: str
+    reasoning: str
+
+
+class BNPLRankingsResponse(BaseModel):
+    rankings: List[BNPLRanking]
+    catalog_version: Optional[str] = None
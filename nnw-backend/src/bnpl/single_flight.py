@@ -0,0 +1,49 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+import metrics
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key onto one in-flight task.
+
+    The shared task is shielded from its callers, so a client disconnecting
+    does not cancel the upstream call the other waiters depend on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.executed = 0
+        self.collapsed = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+            self.executed += 1
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key: str, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every waiter went away.
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "executed": self.executed,
+            "collapsed": self.collapsed,
+            "in_flight": len(self._inflight),
+        }
+
+
+ranking_flight = SingleFlight()
+metrics.register("bnpl_ranking_single_flight", ranking_flight.stats)
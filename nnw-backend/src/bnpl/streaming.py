@@ -0,0 +1,123 @@
+import time
+from typing import AsyncIterator, List
+
+import metrics
+from bnpl.cache import ranking_cache, ranking_cache_key
+from bnpl.catalog import Catalog
+from bnpl.features import representative_price
+from bnpl.llm import build_customer_profile, stream_llm_content
+from bnpl.ranking import ENGINE_MODE, rank_with_engine
+from bnpl.schemas import BNPLRanking, BNPLRankingsResponse
+from config import settings
+from models.profile import Profile
+
+
+class RankingStreamParser:
+    """
+    Incremental parser for the ``{"rankings": [{...}, ...]}`` completion.
+
+    Text is fed in arbitrary chunks; every ranking object is returned as soon as
+    its closing brace arrives. Braces inside JSON strings are ignored, as is
+    anything outside the top-level object (e.g. a stray code fence).
+    """
+
+    def __init__(self):
+        self._buffer = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._object = None
+
+    def feed(self, text: str) -> List[BNPLRanking]:
+        completed = []
+        for char in text:
+            if self._object is not None:
+                self._object.append(char)
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char == "{":
+                self._depth += 1
+                if self._depth == 2:
+                    self._object = [char]
+            elif char == "}":
+                if self._depth == 2 and self._object is not None:
+                    completed.append(BNPLRanking.model_validate_json("".join(self._object)))
+                    self._object = None
+                self._depth = max(self._depth - 1, 0)
+        return completed
+
+
+class StreamingStats:
+    def __init__(self):
+        self.streams = 0
+        self.completed = 0
+        self.failed = 0
+        self.time_to_first_ranking = metrics.LatencyRecorder()
+
+    def stats(self) -> dict:
+        return {
+            "streams": self.streams,
+            "completed": self.completed,
+            "failed": self.failed,
+            "time_to_first_ranking": self.time_to_first_ranking.as_dict(),
+        }
+
+
+streaming_stats = StreamingStats()
+metrics.register("bnpl_streaming", streaming_stats.stats)
+
+
+async def stream_rankings(profile: Profile, product_price: float, catalog: Catalog) -> AsyncIterator[BNPLRanking]:
+    """
+    Yield rankings one at a time. Cached and engine rankings are replayed
+    immediately; otherwise each ranking is emitted as the LLM finishes it and
+    the full response is cached once the stream completes.
+    """
+    started = time.perf_counter()
+    product_price = representative_price(product_price)
+    streaming_stats.streams += 1
+    first = True
+
+    def mark_first():
+        nonlocal first
+        if first:
+            streaming_stats.time_to_first_ranking.observe(time.perf_counter() - started)
+            first = False
+
+    try:
+        if settings.BNPL_RANKING_MODE == ENGINE_MODE:
+            rankings = rank_with_engine(profile, product_price, catalog)
+        else:
+            cache_key = ranking_cache_key(profile, product_price, catalog.version)
+            rankings = await ranking_cache.get(cache_key)
+
+        if rankings is not None:
+            for ranking in rankings.rankings:
+                mark_first()
+                yield ranking
+        else:
+            parser = RankingStreamParser()
+            collected = []
+            prompt = catalog.render_prompt(build_customer_profile(profile, product_price))
+            async for content in stream_llm_content(prompt):
+                for ranking in parser.feed(content):
+                    mark_first()
+                    collected.append(ranking)
+                    yield ranking
+            if collected:
+                await ranking_cache.set(cache_key, BNPLRankingsResponse(
+                    rankings=collected, catalog_version=catalog.version))
+    except Exception:
+        streaming_stats.failed += 1
+        raise
+    streaming_stats.completed += 1
@@ -1,24 +1,154 @@
+from typing import List, Literal, Optional
+
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     ENV: str = "development"
-    PG_USER: str
-    PG_PASSWORD: str
-    PG_HOST: str
-    PG_PORT: str
-    PG_DB: str
+    # Required unless DATABASE_URL is set
+    PG_USER: Optional[str] = None
+    PG_PASSWORD: Optional[str] = None
+    PG_HOST: Optional[str] = None
+    PG_PORT: Optional[str] = None
+    PG_DB: Optional[str] = None
     PG_SSLMODE: str = "require"
     JWT_SECRET: str
+    TOKEN_CLAIMS_CACHE_SIZE: int = 100_000
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5.0
+    # Re-read window for revocations committed out of order, and full reload period
+    TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS: float = 60.0
+    TOKEN_REVOCATION_FULL_SYNC_SECONDS: float = 300.0
+    # Expired refresh-token sweeper (see security/token_sweeper.py)
+    TOKEN_SWEEP_INTERVAL_SECONDS: float = 300.0
+    TOKEN_SWEEP_BATCH_SIZE: int = 5_000
+    TOKEN_SWEEP_MAX_BATCHES: int = 100
+    REFRESH_TOKENS_PARTITIONED: bool = False  # Postgres only
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # Separate pool for bulk user imports (see security/passwords.py)
+    PASSWORD_IMPORT_WORKERS: int = 1
+    PASSWORD_IMPORT_CHUNK_SIZE: int = 16
     STRIPE_API_KEY: str
     STRIPE_WEBHOOK_SECRET: str
+    # Shared Stripe HTTP client (see integration/card/issuers.py)
+    STRIPE_TIMEOUT_SECONDS: float = 30.0
+    STRIPE_MAX_NETWORK_RETRIES: int = 2
+    # Points the Stripe client elsewhere, e.g. a local stripe-mock
+    STRIPE_API_BASE: Optional[str] = None
+    STRIPE_POOL_CONNECTIONS: int = 4
+    STRIPE_POOL_MAXSIZE: int = 32
+    # Merchant validation cache for card creation; invalid results expire sooner
+    MERCHANT_CACHE_VALID_TTL_SECONDS: float = 86_400.0
+    MERCHANT_CACHE_INVALID_TTL_SECONDS: float = 600.0
+    MERCHANT_CACHE_MAX_ENTRIES: int = 50_000
+    # Validated at startup so the first checkouts at these merchants hit the cache
+    MERCHANT_WARM_UP_IDS: List[str] = []
+    # Simulated issuer latency for the mock issuers, e.g. for load tests
+    MOCK_ISSUER_LATENCY_SECONDS: float = 0.0
+    # Inactive cards kept ready per active cardholder (see workers/card_pool.py), 0 disables
+    CARD_POOL_SIZE: int = 0
+    CARD_POOL_CURRENCY: str = "usd"
+    CARD_POOL_REPLENISH_SECONDS: float = 5.0
+    CARD_POOL_REPLENISH_CONCURRENCY: int = 8
+    CARD_POOL_REPLENISH_MAX_PER_RUN: int = 200
+    # A cardholder with a checkout in this window counts as active
+    CARD_POOL_ACTIVE_SECONDS: int = 7 * 86_400
+    CARD_POOL_PRUNE_BATCH_SIZE: int = 1000
     OPENAI_API_KEY: str
+    # Background cardholder provisioning (see workers/cardholder_outbox.py)
+    CARDHOLDER_OUTBOX_POLL_SECONDS: float = 1.0
+    CARDHOLDER_OUTBOX_BATCH_SIZE: int = 50
+    CARDHOLDER_OUTBOX_LEASE_SECONDS: int = 60
+    CARDHOLDER_OUTBOX_MAX_ATTEMPTS: int = 8
+    CARDHOLDER_OUTBOX_BACKOFF_SECONDS: float = 2.0
+    CARDHOLDER_OUTBOX_BACKOFF_MAX_SECONDS: float = 600.0
+    CARDHOLDER_OUTBOX_MAX_PER_SECOND: float = 20.0  # issuer throttle, 0 disables
+    # Stripe webhook queue (see workers/webhook_events.py)
+    WEBHOOK_POLL_SECONDS: float = 0.5
+    WEBHOOK_BATCH_SIZE: int = 100
+    WEBHOOK_CONCURRENCY: int = 16  # events handled at once per batch
+    WEBHOOK_LEASE_SECONDS: int = 60
+    WEBHOOK_MAX_ATTEMPTS: int = 8
+    WEBHOOK_BACKOFF_SECONDS: float = 2.0
+    WEBHOOK_BACKOFF_MAX_SECONDS: float = 600.0
+    # Handled event ids (see workers/webhook_dedupe.py); Stripe redelivers for up to 3 days
+    WEBHOOK_DEDUPE_LRU_SIZE: int = 100_000
+    WEBHOOK_DEDUPE_RETENTION_SECONDS: int = 7 * 86_400
+    WEBHOOK_DEDUPE_PRUNE_SECONDS: float = 3600.0
+    WEBHOOK_DEDUPE_PRUNE_BATCH_SIZE: int = 5_000
+    WEBHOOK_DEDUPE_PRUNE_MAX_BATCHES: int = 100
+    # Bulk user import (see workers/user_import.py)
+    USER_IMPORT_DIR: str = "imports"
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    # A running job not updated for this long is taken as abandoned and can be
+    # resumed; must exceed the time one batch takes
+    USER_IMPORT_LEASE_SECONDS: int = 900
+    # Point the OpenAI client at another endpoint, e.g. a local fake server in tests
+    OPENAI_API_BASE: Optional[str] = None
+    OPENAI_TIMEOUT_SECONDS: float = 15.0
+    REDIS_URL: Optional[str] = None
+    # Overrides the Postgres URL, e.g. "sqlite+aiosqlite:///:memory:" for tests
+    DATABASE_URL: Optional[str] = None
+    # Connection pool tuning (ignored by the SQLite stand-in)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 0  # 0 disables the server-side timeout
+    # BNPL ranking cache ("memory" per process, or "redis" shared via REDIS_URL;
+    # without REDIS_URL the memory backend is used)
+    BNPL_CACHE_BACKEND: str = "memory"
+    BNPL_CACHE_TTL_SECONDS: int = 900
+    BNPL_CACHE_MAX_ENTRIES: int = 10_000
+    BNPL_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    # Rankings are computed for the middle of the price's band and cached per band
+    BNPL_PRICE_BUCKET: float = 10.0
+    # "engine" (rules only), "llm" (LLM with engine fallback on timeout) or
+    # "hybrid" (engine answer now, LLM enrichment cached in the background)
+    BNPL_RANKING_MODE: Literal["engine", "llm", "hybrid"] = "llm"
+    BNPL_BATCH_MAX_ITEMS: int = 500
+    BNPL_BATCH_CONCURRENCY: int = 8
+    # Defaults to the provider_terms.json bundled with the bnpl package
+    BNPL_CATALOG_PATH: Optional[str] = None
+    BNPL_CATALOG_RELOAD_SECONDS: float = 5.0  # 0 disables hot reload
+    # Buffer point credits and write them to the ledger as one batched insert
+    POINTS_WRITE_BEHIND: bool = False
+    POINTS_FLUSH_INTERVAL_MS: float = 5.0
+    POINTS_FLUSH_MAX_ENTRIES: int = 5_000
+    # Rolls ledger entries into the UserPoints snapshots (see points/compaction.py)
+    POINTS_COMPACTION_INTERVAL_SECONDS: float = 30.0
+    POINTS_COMPACTION_BATCH_ENTRIES: int = 50_000
+    # Per-process balance cache; writes invalidate it everywhere through the
+    # bus ("local" within one process, or "redis" pub/sub via REDIS_URL)
+    POINTS_BALANCE_CACHE_TTL_SECONDS: float = 30.0
+    POINTS_BALANCE_CACHE_MAX_ENTRIES: int = 100_000
+    POINTS_BALANCE_BUS: str = "local"
+    REWARDS_CATALOG_REFRESH_SECONDS: float = 10.0
+    # Re-read window for admin writes committed out of order, and full reload period
+    REWARDS_CATALOG_REFRESH_OVERLAP_SECONDS: float = 60.0
+    REWARDS_CATALOG_FULL_RELOAD_SECONDS: float = 300.0
+    REWARDS_HISTORY_PAGE_SIZE: int = 50
+    REWARDS_HISTORY_MAX_PAGE_SIZE: int = 200
+
+    @model_validator(mode="after")
+    def _require_postgres_settings(self) -> "Settings":
+        if not self.DATABASE_URL:
+            missing = [name for name in ("PG_USER", "PG_PASSWORD", "PG_HOST", "PG_PORT", "PG_DB")
+                       if getattr(self, name) is None]
+            if missing:
+                raise ValueError(f"{', '.join(missing)} must be set when DATABASE_URL is not")
+        return self
 
     @property
     def database_url(self) -> str:
+        if self.DATABASE_URL:
+            return self.DATABASE_URL
         return (
-            f"postgresql://{self.PG_USER}:{self.PG_PASSWORD}@"
-            f"{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}?sslmode={self.PG_SSLMODE}"
+            f"postgresql+asyncpg://{self.PG_USER}:{self.PG_PASSWORD}@"
+            f"{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}?ssl={self.PG_SSLMODE}"
         )
 
     class Config:
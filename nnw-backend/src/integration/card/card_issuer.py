@@ -1,5 +1,14 @@
 from abc import ABC, abstractmethod
 from typing import List, Optional
+from pydantic import BaseModel
+
+
+class CardDetails(BaseModel):
+    card_number: str
+    exp_date: str
+    cvv: str
+    name: str
+    billing_address: str
 
 
 class CardIssuer(ABC):
@@ -56,3 +65,106 @@ class CardIssuer(ABC):
           An exception if the card retrieval fails or card is not found.
         """
         pass
+
+
+class AsyncCardIssuer(ABC):
+    """
+    Async variant of CardIssuer for use on the event loop; same contract,
+    with every call awaited instead of blocking.
+    """
+
+    @abstractmethod
+    async def create_card(
+        self,
+        cardholder_id: str,
+        purchase_amount: int,
+        currency: str,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ):
+        """
+        See CardIssuer.create_card.
+        """
+        pass
+
+    @abstractmethod
+    async def get_card_details(self, card_id: str) -> CardDetails:
+        """
+        See CardIssuer.get_card_details.
+        """
+        pass
+
+    @abstractmethod
+    async def cancel_card(self, card_id: str):
+        """
+        Cancel a card so it can no longer authorize, e.g. once a one-time
+        card has been used. Cancelling an already canceled card is a no-op.
+        """
+        pass
+
+    async def create_card_with_details(
+        self,
+        cardholder_id: str,
+        purchase_amount: int,
+        currency: str,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardDetails:
+        """
+        Create a card and return its details. Implementations may overlap the
+        underlying calls; the default simply runs them back to back.
+        """
+        card = await self.create_card(
+            cardholder_id, purchase_amount, currency, merchant_id,
+            allowed_categories, blocked_categories, expiration_seconds)
+        return await self.get_card_details(card.id)
+
+    @abstractmethod
+    async def create_pool_card(self, cardholder_id: str, currency: str):
+        """
+        Create an inactive virtual card with no spending controls, to be held
+        in the card pool until a checkout claims it.
+        """
+        pass
+
+    @abstractmethod
+    async def activate_card(
+        self,
+        card_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ):
+        """
+        Activate a pooled card, applying the spending controls and metadata
+        create_card would have set for the same purchase.
+
+        Raises:
+          An exception if the card is unknown or no longer inactive.
+        """
+        pass
+
+    async def activate_card_with_details(
+        self,
+        card_id: str,
+        cardholder_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardDetails:
+        """
+        Activate a pooled card and return its details; see
+        create_card_with_details.
+        """
+        await self.activate_card(
+            card_id, purchase_amount, merchant_id,
+            allowed_categories, blocked_categories, expiration_seconds)
+        return await self.get_card_details(card_id)
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
+from typing import Optional
 
 
 class CardholderIssuer(ABC):
     @abstractmethod
-    def create_cardholder(self, name: str, email: str, phone_number: str, address: str) -> dict:
+    def create_cardholder(self, name: str, email: str, phone_number: str, address: str,
+                          idempotency_key: Optional[str] = None) -> dict:
         """
         Create a cardholder in the card issuing system.
 
@@ -12,6 +14,8 @@ class CardholderIssuer(ABC):
           - email: Email address.
           - phone_number: Contact phone number.
           - address: Billing address (as a string or serialized structure).
+          - idempotency_key: Optional key making retries safe; a repeat call with
+            the same key returns the cardholder created by the first one.
 
         Returns:
           A dictionary containing cardholder details (including a unique cardholder id).
@@ -20,3 +24,17 @@ class CardholderIssuer(ABC):
           An exception if cardholder creation fails.
         """
         pass
+
+
+class AsyncCardholderIssuer(ABC):
+    """
+    Async variant of CardholderIssuer for use on the event loop.
+    """
+
+    @abstractmethod
+    async def create_cardholder(self, name: str, email: str, phone_number: str, address: str,
+                                idempotency_key: Optional[str] = None) -> dict:
+        """
+        See CardholderIssuer.create_cardholder.
+        """
+        pass
@@ -0,0 +1,87 @@
+"""
+Card issuers built once at startup and shared by every request.
+
+The app uses the async issuers so slow issuer calls never block the event
+loop. The Stripe issuers share one ``StripeClient``: async calls go over a
+pooled, keep-alive httpx client, and the same StripeClient can still serve
+sync callers over a pooled ``requests.Session``. The API key lives on the
+client rather than in ``stripe.api_key``.
+"""
+import logging
+import time
+
+import metrics
+from config import settings
+from .card_issuer import AsyncCardIssuer
+from .cardholder import AsyncCardholderIssuer
+from .mock_card_issuer import AsyncMockCardIssuer
+from .mock_cardholder import AsyncMockCardholderIssuer
+from .stripe_card_issuer import AsyncStripeCardIssuer
+from .stripe_cardholder import AsyncStripeCardholderIssuer
+
+logger = logging.getLogger(__name__)
+
+
+class CardIssuers:
+    def __init__(self, card: AsyncCardIssuer, cardholder: AsyncCardholderIssuer, http_client=None):
+        self.card = card
+        self.cardholder = cardholder
+        self._http_client = http_client
+
+    async def warm_up(self) -> None:
+        """Pre-validate MERCHANT_WARM_UP_IDS."""
+        merchant_cache = getattr(self.card, "merchant_cache", None)
+        if merchant_cache is None or not settings.MERCHANT_WARM_UP_IDS:
+            return
+        start = time.perf_counter()
+        valid = await merchant_cache.warm_up(settings.MERCHANT_WARM_UP_IDS)
+        logger.info("Warmed merchant cache: %d/%d valid in %.2fs", valid,
+                    len(settings.MERCHANT_WARM_UP_IDS), time.perf_counter() - start)
+
+    async def close(self) -> None:
+        if self._http_client is not None:
+            self._http_client.close()
+            await self._http_client.close_async()
+
+
+def build_stripe_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    # Retries are left to the Stripe client, which knows which are safe
+    adapter = HTTPAdapter(
+        pool_connections=settings.STRIPE_POOL_CONNECTIONS,
+        pool_maxsize=settings.STRIPE_POOL_MAXSIZE,
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def build_stripe_client():
+    import stripe
+
+    http_client = stripe.RequestsClient(
+        timeout=settings.STRIPE_TIMEOUT_SECONDS,
+        session=build_stripe_session(),
+        async_fallback_client=stripe.HTTPXClient(timeout=settings.STRIPE_TIMEOUT_SECONDS),
+    )
+    client = stripe.StripeClient(
+        settings.STRIPE_API_KEY,
+        http_client=http_client,
+        max_network_retries=settings.STRIPE_MAX_NETWORK_RETRIES,
+        base_addresses={"api": settings.STRIPE_API_BASE} if settings.STRIPE_API_BASE else {},
+    )
+    return client, http_client
+
+
+def build_card_issuers() -> CardIssuers:
+    if settings.ENV != "production":
+        latency = settings.MOCK_ISSUER_LATENCY_SECONDS
+        return CardIssuers(AsyncMockCardIssuer(latency_seconds=latency),
+                           AsyncMockCardholderIssuer(latency_seconds=latency))
+
+    client, http_client = build_stripe_client()
+    card_issuer = AsyncStripeCardIssuer(client)
+    metrics.register("card_merchant_cache", card_issuer.merchant_cache.stats)
+    return CardIssuers(card_issuer, AsyncStripeCardholderIssuer(client), http_client)
@@ -0,0 +1,162 @@
+"""
+Cache of merchant validation results for card creation.
+
+Valid and invalid merchants are cached with separate TTLs (invalid ones
+are re-checked sooner, in case a merchant is onboarded), the cache is an
+LRU bounded by entry count, and concurrent lookups of the same uncached
+merchant wait on a single upstream call (per thread for the sync issuer,
+per event loop for the async one). Lookup errors other than a
+definitive "not found" are not cached, so a transient issuer outage cannot
+pin a good merchant as invalid.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+import metrics
+
+
+class MerchantLookupFailed(Exception):
+    """The issuer could not say either way; the result must not be cached."""
+
+
+class MerchantValidationCache:
+    def __init__(
+        self,
+        lookup: Callable[[str], bool],
+        lookup_async: Optional[Callable[[str], Awaitable[bool]]],
+        valid_ttl_seconds: float,
+        invalid_ttl_seconds: float,
+        max_entries: int,
+    ):
+        self.lookup = lookup
+        self.lookup_async = lookup_async
+        self.valid_ttl_seconds = valid_ttl_seconds
+        self.invalid_ttl_seconds = invalid_ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # merchant_id -> (valid, expires_at)
+        self._entries: "OrderedDict[str, Tuple[bool, float]]" = OrderedDict()
+        self._inflight: Dict[str, threading.Event] = {}
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.lookup_errors = 0
+        self.lookup_latency = metrics.LatencyRecorder()
+
+    def _cached(self, merchant_id: str) -> Optional[bool]:
+        entry = self._entries.get(merchant_id)
+        if entry is None:
+            return None
+        valid, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[merchant_id]
+            return None
+        self._entries.move_to_end(merchant_id)
+        return valid
+
+    def is_valid(self, merchant_id: str) -> bool:
+        while True:
+            with self._lock:
+                valid = self._cached(merchant_id)
+                if valid is not None:
+                    self.hits += 1
+                    return valid
+                event = self._inflight.get(merchant_id)
+                if event is None:
+                    event = self._inflight[merchant_id] = threading.Event()
+                    self.misses += 1
+                    break
+                self.collapsed += 1
+            event.wait()
+            with self._lock:
+                valid = self._cached(merchant_id)
+            if valid is not None:
+                return valid
+            # The leader's lookup failed; fall through and try ourselves
+
+        try:
+            return self._load(merchant_id)
+        finally:
+            with self._lock:
+                del self._inflight[merchant_id]
+            event.set()
+
+    def _load(self, merchant_id: str) -> bool:
+        start = time.perf_counter()
+        try:
+            valid = self.lookup(merchant_id)
+        except MerchantLookupFailed:
+            with self._lock:
+                self.lookup_errors += 1
+            return False
+        finally:
+            self.lookup_latency.observe(time.perf_counter() - start)
+        self._store(merchant_id, valid)
+        return valid
+
+    async def is_valid_async(self, merchant_id: str) -> bool:
+        with self._lock:
+            valid = self._cached(merchant_id)
+            if valid is not None:
+                self.hits += 1
+                return valid
+        task = self._inflight_async.get(merchant_id)
+        if task is not None:
+            self.collapsed += 1
+            return await asyncio.shield(task)
+        self.misses += 1
+        task = asyncio.ensure_future(self._load_async(merchant_id))
+        self._inflight_async[merchant_id] = task
+        task.add_done_callback(lambda _: self._inflight_async.pop(merchant_id, None))
+        return await asyncio.shield(task)
+
+    async def _load_async(self, merchant_id: str) -> bool:
+        start = time.perf_counter()
+        try:
+            valid = await self.lookup_async(merchant_id)
+        except MerchantLookupFailed:
+            self.lookup_errors += 1
+            return False
+        finally:
+            self.lookup_latency.observe(time.perf_counter() - start)
+        self._store(merchant_id, valid)
+        return valid
+
+    def _store(self, merchant_id: str, valid: bool) -> None:
+        ttl = self.valid_ttl_seconds if valid else self.invalid_ttl_seconds
+        with self._lock:
+            self._entries[merchant_id] = (valid, time.monotonic() + ttl)
+            self._entries.move_to_end(merchant_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def warm_up(self, merchant_ids: Iterable[str], concurrency: int = 8) -> int:
+        """Validate ``merchant_ids`` ahead of traffic; returns how many are valid."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def check(merchant_id: str) -> bool:
+            async with semaphore:
+                return await self.is_valid_async(merchant_id)
+
+        return sum(await asyncio.gather(*(check(m) for m in merchant_ids)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            valid = sum(1 for is_valid, _ in self._entries.values() if is_valid)
+            entries = len(self._entries)
+        lookups = self.hits + self.misses + self.collapsed
+        return {
+            "entries": entries,
+            "valid_entries": valid,
+            "invalid_entries": entries - valid,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collapsed": self.collapsed,
+            "hit_ratio": round((self.hits + self.collapsed) / lookups, 4) if lookups else 0.0,
+            "lookup_errors": self.lookup_errors,
+            "lookup": self.lookup_latency.as_dict(),
+        }
@@ -1,19 +1,13 @@
+import asyncio
+import threading
 import uuid
 import random
 from datetime import datetime, timedelta
-from typing import List, Optional
-from .card_issuer import CardIssuer
+from typing import Dict, List, Optional
+from .card_issuer import AsyncCardIssuer, CardDetails, CardIssuer
 from pydantic import BaseModel
 
 
-class CardDetails(BaseModel):
-    card_number: str
-    exp_date: str
-    cvv: str
-    name: str
-    billing_address: str
-
-
 class CardCreatedResponse(BaseModel):
     id: str
     cardholder: str
@@ -25,11 +19,67 @@ class CardCreatedResponse(BaseModel):
     created: str
     provider: str
     expiration: str
+    status: str = "active"
+    allowed_categories: Optional[List[str]] = None
+    blocked_categories: Optional[List[str]] = None
 
 
-class MockCardIssuer(CardIssuer):
+class MockCardStore:
+    """
+    Process-wide store of mock cards. The issuer is built once at startup and
+    shared across requests (and threadpool workers), so access is locked.
+    """
+
     def __init__(self):
-        self.mock_cards = {}
+        self._lock = threading.Lock()
+        self._cards: Dict[str, CardDetails] = {}
+        self._created: Dict[str, CardCreatedResponse] = {}
+
+    def put(self, card_id: str, details: CardDetails, card: CardCreatedResponse) -> None:
+        with self._lock:
+            self._cards[card_id] = details
+            self._created[card_id] = card
+
+    def get(self, card_id: str) -> Optional[CardDetails]:
+        with self._lock:
+            return self._cards.get(card_id)
+
+    def get_card(self, card_id: str) -> Optional[CardCreatedResponse]:
+        with self._lock:
+            return self._created.get(card_id)
+
+    def activate(self, card_id: str, **changes) -> CardCreatedResponse:
+        """Move an inactive card to active, as Stripe's card update would."""
+        with self._lock:
+            card = self._created.get(card_id)
+            if card is None:
+                raise ValueError(f"Card with ID {card_id} not found.")
+            if card.status != "inactive":
+                raise ValueError(f"Card with ID {card_id} is {card.status}, not inactive.")
+            card = card.model_copy(update={**changes, "status": "active"})
+            self._created[card_id] = card
+            return card
+
+    def cancel(self, card_id: str) -> CardCreatedResponse:
+        with self._lock:
+            card = self._created.get(card_id)
+            if card is None:
+                raise ValueError(f"Card with ID {card_id} not found.")
+            card = card.model_copy(update={"status": "canceled"})
+            self._created[card_id] = card
+            return card
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._cards)
+
+
+mock_card_store = MockCardStore()
+
+
+class MockCardIssuer(CardIssuer):
+    def __init__(self, store: MockCardStore = mock_card_store):
+        self.mock_cards = store
 
     def create_card(
         self,
@@ -41,12 +91,55 @@ class MockCardIssuer(CardIssuer):
         blocked_categories: Optional[List[str]] = None,
         expiration_seconds: int = 3600
     ) -> CardCreatedResponse:
+        return self._issue(
+            cardholder_id, currency,
+            status="active",
+            purchase_limit=purchase_amount,
+            merchant_id=merchant_id,
+            allowed_categories=allowed_categories,
+            blocked_categories=blocked_categories,
+            expiration=self._expiration(expiration_seconds),
+        )
+
+    def create_pool_card(self, cardholder_id: str, currency: str) -> CardCreatedResponse:
+        return self._issue(
+            cardholder_id, currency,
+            status="inactive",
+            purchase_limit=0,
+            merchant_id="",
+            expiration="",
+        )
+
+    def activate_card(
+        self,
+        card_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardCreatedResponse:
+        return self.mock_cards.activate(
+            card_id,
+            purchase_limit=purchase_amount,
+            merchant_id=merchant_id,
+            allowed_categories=allowed_categories,
+            blocked_categories=blocked_categories,
+            expiration=self._expiration(expiration_seconds),
+        )
+
+    def cancel_card(self, card_id: str) -> CardCreatedResponse:
+        return self.mock_cards.cancel(card_id)
+
+    @staticmethod
+    def _expiration(expiration_seconds: int) -> str:
+        return (datetime.now() + timedelta(seconds=expiration_seconds)).isoformat()
+
+    def _issue(self, cardholder_id: str, currency: str, **fields) -> CardCreatedResponse:
         card_id = f"mock_card_{uuid.uuid4().hex[:8]}"
         last4 = str(random.randint(1000, 9999))
         card_number = f"4111 1111 1111 {last4}"
         cvv = str(random.randint(100, 999))
-        expiration_time = datetime.now() + timedelta(seconds=expiration_seconds)
-        expiration_str = expiration_time.isoformat()
 
         card_details = CardDetails(
             card_number=card_number,
@@ -55,23 +148,97 @@ class MockCardIssuer(CardIssuer):
             name="Mock User",
             billing_address="123 Mock St, Mock City, Mock Country"
         )
-
-        self.mock_cards[card_id] = card_details
-
-        return CardCreatedResponse(
+        card = CardCreatedResponse(
             id=card_id,
             cardholder=cardholder_id,
             last4=last4,
-            purchase_limit=purchase_amount,
             currency=currency,
-            merchant_id=merchant_id,
             usage="one-time",
             created=datetime.now().isoformat(),
             provider="mock",
-            expiration=expiration_str
+            **fields
         )
 
+        self.mock_cards.put(card_id, card_details, card)
+        return card
+
     def get_card_details(self, card_id: str) -> CardDetails:
-        if card_id not in self.mock_cards:
+        card_details = self.mock_cards.get(card_id)
+        if card_details is None:
             raise ValueError(f"Card with ID {card_id} not found.")
-        return self.mock_cards[card_id]
+        return card_details
+
+
+class AsyncMockCardIssuer(AsyncCardIssuer):
+    """
+    Async mock sharing the store of the sync one. ``latency_seconds`` is
+    awaited on every call to stand in for a slow issuer in load tests.
+    """
+
+    def __init__(self, store: MockCardStore = mock_card_store, latency_seconds: float = 0.0):
+        self.issuer = MockCardIssuer(store)
+        self.latency_seconds = latency_seconds
+
+    async def _delay(self) -> None:
+        if self.latency_seconds > 0:
+            await asyncio.sleep(self.latency_seconds)
+
+    async def create_card(
+        self,
+        cardholder_id: str,
+        purchase_amount: int,
+        currency: str,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardCreatedResponse:
+        await self._delay()
+        return self.issuer.create_card(
+            cardholder_id, purchase_amount, currency, merchant_id,
+            allowed_categories, blocked_categories, expiration_seconds)
+
+    async def get_card_details(self, card_id: str) -> CardDetails:
+        await self._delay()
+        return self.issuer.get_card_details(card_id)
+
+    async def cancel_card(self, card_id: str) -> CardCreatedResponse:
+        await self._delay()
+        return self.issuer.cancel_card(card_id)
+
+    async def create_pool_card(self, cardholder_id: str, currency: str) -> CardCreatedResponse:
+        await self._delay()
+        return self.issuer.create_pool_card(cardholder_id, currency)
+
+    async def activate_card(
+        self,
+        card_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardCreatedResponse:
+        await self._delay()
+        return self.issuer.activate_card(
+            card_id, purchase_amount, merchant_id,
+            allowed_categories, blocked_categories, expiration_seconds)
+
+    async def activate_card_with_details(
+        self,
+        card_id: str,
+        cardholder_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardDetails:
+        # Overlaps the two calls like the Stripe issuer does
+        _, details = await asyncio.gather(
+            self.activate_card(
+                card_id, purchase_amount, merchant_id,
+                allowed_categories, blocked_categories, expiration_seconds),
+            self.get_card_details(card_id),
+        )
+        return details
@@ -1,13 +1,27 @@
+import asyncio
+import threading
 import uuid
-from .cardholder import CardholderIssuer
+from typing import Dict, Optional
+from .cardholder import AsyncCardholderIssuer, CardholderIssuer
 
 
 class MockCardholderIssuer(CardholderIssuer):
-    def create_cardholder(self, name: str, email: str, phone_number: str, address: str) -> dict:
+    def __init__(self):
+        # Replays by idempotency key, like Stripe
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, dict] = {}
+
+    def create_cardholder(self, name: str, email: str, phone_number: str, address: str,
+                          idempotency_key: Optional[str] = None) -> dict:
         """
         Mock implementation of the CardholderIssuer interface.
         Generates a mock cardholder ID and returns test data.
         """
+        if idempotency_key is not None:
+            with self._lock:
+                if idempotency_key not in self._by_key:
+                    self._by_key[idempotency_key] = self.create_cardholder(name, email, phone_number, address)
+                return self._by_key[idempotency_key]
         cardholder_id = f"mock_cardholder_{uuid.uuid4().hex[:8]}"
         return {
             "id": cardholder_id,
@@ -17,3 +31,15 @@ class MockCardholderIssuer(CardholderIssuer):
             "address": address,
             "provider": "mock"
         }
+
+
+class AsyncMockCardholderIssuer(AsyncCardholderIssuer):
+    def __init__(self, latency_seconds: float = 0.0):
+        self.issuer = MockCardholderIssuer()
+        self.latency_seconds = latency_seconds
+
+    async def create_cardholder(self, name: str, email: str, phone_number: str, address: str,
+                                idempotency_key: Optional[str] = None) -> dict:
+        if self.latency_seconds > 0:
+            await asyncio.sleep(self.latency_seconds)
+        return self.issuer.create_cardholder(name, email, phone_number, address, idempotency_key)
@@ -1,13 +1,143 @@
+import asyncio
 from datetime import datetime, timedelta
 from typing import List, Optional
-from .card_issuer import CardIssuer
+from config import settings
+from .card_issuer import AsyncCardIssuer, CardDetails, CardIssuer
+from .merchant_cache import MerchantLookupFailed, MerchantValidationCache
+
+
+def merchant_path(merchant_id: str) -> str:
+    # Hypothetical Issuing Merchant endpoint used to validate merchants.
+    return f"/v1/issuing/merchants/{merchant_id}"
+
+
+def is_merchant_response(client, response) -> bool:
+    merchant = client.deserialize(response, api_mode="V1")
+    return bool(merchant and merchant.get("id"))
+
+
+def merchant_lookup_error(error: Exception) -> Optional[Exception]:
+    """None when Stripe definitively said "no such merchant", else the error to raise."""
+    if getattr(error, "http_status", None) == 404:
+        return None
+    return MerchantLookupFailed(str(error))
+
+
+def build_card_params(
+    cardholder_id: str,
+    purchase_amount: int,
+    currency: str,
+    merchant_id: str,
+    valid_merchant: bool,
+    allowed_categories: Optional[List[str]],
+    blocked_categories: Optional[List[str]],
+    expiration_seconds: int,
+) -> dict:
+    # Set up spending controls with a per-authorization limit.
+    spending_controls = {
+        "spending_limits": [
+            {
+                "amount": purchase_amount,
+                "interval": "per_authorization"
+            }
+        ]
+    }
+
+    if valid_merchant:
+        spending_controls["allowed_merchants"] = [merchant_id]
+    elif allowed_categories:
+        spending_controls["allowed_categories"] = allowed_categories
+
+    if blocked_categories:
+        spending_controls["blocked_categories"] = blocked_categories
+
+    # Compute the card expiration datetime based on expiration_seconds.
+    expiration_time = datetime.now() + timedelta(seconds=expiration_seconds)
+    # Note: Stripe may not allow you to directly set a custom expiration,
+    # so we include it in metadata for downstream processing.
+    expiration_str = expiration_time.isoformat()
+
+    return {
+        "cardholder": cardholder_id,
+        "currency": currency,
+        "type": "virtual",
+        "spending_controls": spending_controls,
+        "metadata": {
+            "expiration_time": expiration_str,
+            "one_time_use": "true"
+        }
+    }
+
+
+def build_pool_card_params(cardholder_id: str, currency: str) -> dict:
+    # Inactive cards cannot authorize, so spending controls wait for activation
+    return {
+        "cardholder": cardholder_id,
+        "currency": currency,
+        "type": "virtual",
+        "status": "inactive",
+        "metadata": {"pool": "true"},
+    }
+
+
+def build_activation_params(
+    purchase_amount: int,
+    merchant_id: str,
+    valid_merchant: bool,
+    allowed_categories: Optional[List[str]],
+    blocked_categories: Optional[List[str]],
+    expiration_seconds: int,
+) -> dict:
+    # Same controls and metadata as a card created for this purchase
+    params = build_card_params(
+        "", purchase_amount, "", merchant_id, valid_merchant,
+        allowed_categories, blocked_categories, expiration_seconds)
+    return {
+        "status": "active",
+        "spending_controls": params["spending_controls"],
+        "metadata": params["metadata"],
+    }
+
+
+def build_card_details(card, cardholder) -> CardDetails:
+    address = cardholder.billing.address
+    return CardDetails(
+        card_number=card.number,
+        exp_date=f"{card.exp_month:02d}/{card.exp_year % 100:02d}",
+        cvv=card.cvc,
+        name=cardholder.name,
+        billing_address=", ".join(
+            part for part in (address.line1, address.city, address.postal_code, address.country) if part),
+    )
+
+
+def build_merchant_cache(lookup, lookup_async) -> MerchantValidationCache:
+    return MerchantValidationCache(
+        lookup,
+        lookup_async,
+        valid_ttl_seconds=settings.MERCHANT_CACHE_VALID_TTL_SECONDS,
+        invalid_ttl_seconds=settings.MERCHANT_CACHE_INVALID_TTL_SECONDS,
+        max_entries=settings.MERCHANT_CACHE_MAX_ENTRIES,
+    )
 
 
 class StripeCardIssuer(CardIssuer):
-    def __init__(self, stripe_api_key: str):
+    def __init__(self, client, merchant_cache: Optional[MerchantValidationCache] = None):
+        # A long-lived stripe.StripeClient on a pooled HTTP client (see issuers.py)
+        self.client = client
+        self.merchant_cache = merchant_cache or build_merchant_cache(self._lookup_merchant, None)
+
+    def _lookup_merchant(self, merchant_id: str) -> bool:
         import stripe
-        stripe.api_key = stripe_api_key
-        self.stripe = stripe
+
+        try:
+            response = self.client.raw_request("get", merchant_path(merchant_id))
+        except stripe.StripeError as e:
+            error = merchant_lookup_error(e)
+            if error is None:
+                return False
+            raise error from e
+        return is_merchant_response(self.client, response)
 
     def create_card(
         self,
@@ -43,48 +173,132 @@ class StripeCardIssuer(CardIssuer):
         Raises:
           An exception if the Stripe API call fails.
         """
-        # Set up spending controls with a per-authorization limit.
-        spending_controls = {
-            "spending_limits": [
-                {
-                    "amount": purchase_amount,
-                    "interval": "per_authorization"
-                }
-            ]
-        }
+        # Validate merchant_id via Stripe's Issuing Merchant API; results are
+        # cached so repeat merchants skip the extra round trip.
+        valid_merchant = self.merchant_cache.is_valid(merchant_id)
+
+        return self.client.issuing.cards.create(params=build_card_params(
+            cardholder_id, purchase_amount, currency, merchant_id, valid_merchant,
+            allowed_categories, blocked_categories, expiration_seconds))
+
+    def get_card_details(self, card_id: str) -> CardDetails:
+        """
+        Retrieves the card with its full number and CVC expanded, along with
+        the cardholder for the name and billing address.
+        """
+        card = self.client.issuing.cards.retrieve(
+            card_id, params={"expand": ["number", "cvc", "cardholder"]})
+        return build_card_details(card, card.cardholder)
+
+
+class AsyncStripeCardIssuer(AsyncCardIssuer):
+    """
+    Stripe Issuing over the StripeClient's async HTTP client, so slow Stripe
+    calls never block the event loop.
+    """
+
+    def __init__(self, client, merchant_cache: Optional[MerchantValidationCache] = None):
+        self.client = client
+        self.merchant_cache = merchant_cache or build_merchant_cache(None, self._lookup_merchant)
+
+    async def _lookup_merchant(self, merchant_id: str) -> bool:
+        import stripe
 
-        # Attempt to validate merchant_id via Stripe's Issuing Merchant API.
-        valid_merchant = False
         try:
-            # Hypothetical API call to validate merchant.
-            merchant = self.stripe.issuing.Merchant.retrieve(merchant_id)
-            if merchant and merchant.get("id"):
-                valid_merchant = True
-        except Exception:
-            valid_merchant = False
-
-        if valid_merchant:
-            spending_controls["allowed_merchants"] = [merchant_id]
-        elif allowed_categories:
-            spending_controls["allowed_categories"] = allowed_categories
-
-        if blocked_categories:
-            spending_controls["blocked_categories"] = blocked_categories
-
-        # Compute the card expiration datetime based on expiration_seconds.
-        expiration_time = datetime.now() + timedelta(seconds=expiration_seconds)
-        # Note: Stripe may not allow you to directly set a custom expiration,
-        # so we include it in metadata for downstream processing.
-        expiration_str = expiration_time.isoformat()
-
-        card = self.stripe.issuing.Card.create(
-            cardholder=cardholder_id,
-            currency=currency,
-            type="virtual",
-            spending_controls=spending_controls,
-            metadata={
-                "expiration_time": expiration_str,
-                "one_time_use": "true"
-            }
+            response = await self.client.raw_request_async("get", merchant_path(merchant_id))
+        except stripe.StripeError as e:
+            error = merchant_lookup_error(e)
+            if error is None:
+                return False
+            raise error from e
+        return is_merchant_response(self.client, response)
+
+    async def create_card(
+        self,
+        cardholder_id: str,
+        purchase_amount: int,
+        currency: str,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ):
+        valid_merchant = await self.merchant_cache.is_valid_async(merchant_id)
+        return await self.client.issuing.cards.create_async(params=build_card_params(
+            cardholder_id, purchase_amount, currency, merchant_id, valid_merchant,
+            allowed_categories, blocked_categories, expiration_seconds))
+
+    async def get_card_details(self, card_id: str) -> CardDetails:
+        card = await self.client.issuing.cards.retrieve_async(
+            card_id, params={"expand": ["number", "cvc", "cardholder"]})
+        return build_card_details(card, card.cardholder)
+
+    async def cancel_card(self, card_id: str):
+        return await self.client.issuing.cards.update_async(card_id, params={"status": "canceled"})
+
+    async def create_card_with_details(
+        self,
+        cardholder_id: str,
+        purchase_amount: int,
+        currency: str,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardDetails:
+        """
+        Fetches the cardholder while the card is being created, leaving one
+        sequential round trip after creation for the number and CVC (Stripe
+        only returns those from retrieve).
+        """
+        card, cardholder = await asyncio.gather(
+            self.create_card(
+                cardholder_id, purchase_amount, currency, merchant_id,
+                allowed_categories, blocked_categories, expiration_seconds),
+            self.client.issuing.cardholders.retrieve_async(cardholder_id),
+        )
+        card = await self.client.issuing.cards.retrieve_async(
+            card.id, params={"expand": ["number", "cvc"]})
+        return build_card_details(card, cardholder)
+
+    async def create_pool_card(self, cardholder_id: str, currency: str):
+        return await self.client.issuing.cards.create_async(
+            params=build_pool_card_params(cardholder_id, currency))
+
+    async def activate_card(
+        self,
+        card_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ):
+        valid_merchant = await self.merchant_cache.is_valid_async(merchant_id)
+        return await self.client.issuing.cards.update_async(card_id, params=build_activation_params(
+            purchase_amount, merchant_id, valid_merchant,
+            allowed_categories, blocked_categories, expiration_seconds))
+
+    async def activate_card_with_details(
+        self,
+        card_id: str,
+        cardholder_id: str,
+        purchase_amount: int,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardDetails:
+        """
+        The card already exists, so the number, CVC and cardholder are fetched
+        alongside the activation: a pool hit costs one parallel round trip.
+        Details are only returned once the activation has succeeded.
+        """
+        _, card, cardholder = await asyncio.gather(
+            self.activate_card(
+                card_id, purchase_amount, merchant_id,
+                allowed_categories, blocked_categories, expiration_seconds),
+            self.client.issuing.cards.retrieve_async(card_id, params={"expand": ["number", "cvc"]}),
+            self.client.issuing.cardholders.retrieve_async(cardholder_id),
         )
-        return card
+        return build_card_details(card, cardholder)
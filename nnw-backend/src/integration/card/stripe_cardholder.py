@@ -1,26 +1,48 @@
-from .cardholder import CardholderIssuer
+from typing import Optional
+from .cardholder import AsyncCardholderIssuer, CardholderIssuer
+
+
+def build_request_options(idempotency_key: Optional[str]) -> dict:
+    return {"idempotency_key": idempotency_key} if idempotency_key else {}
+
+
+def build_cardholder_params(name: str, email: str, phone_number: str, address: str) -> dict:
+    return {
+        "type": "individual",
+        "name": name,
+        "email": email,
+        "phone_number": phone_number,
+        "billing": {
+            "address": {
+                "line1": address
+            }
+        }
+    }
 
 
 class StripeCardholderIssuer(CardholderIssuer):
-    def __init__(self, stripe_api_key: str):
-        import stripe
-        stripe.api_key = stripe_api_key
-        self.stripe = stripe
+    def __init__(self, client):
+        # A long-lived stripe.StripeClient on a pooled HTTP client (see issuers.py)
+        self.client = client
 
-    def create_cardholder(self, name: str, email: str, phone_number: str, address: str) -> dict:
+    def create_cardholder(self, name: str, email: str, phone_number: str, address: str,
+                          idempotency_key: Optional[str] = None) -> dict:
         """
         Creates a cardholder using Stripe Issuing.
         For individuals, the type is "individual". Billing address is passed as part of the billing object.
         """
-        cardholder = self.stripe.issuing.Cardholder.create(
-            type="individual",
-            name=name,
-            email=email,
-            phone_number=phone_number,
-            billing={
-                "address": {
-                    "line1": address
-                }
-            }
-        )
+        cardholder = self.client.issuing.cardholders.create(
+            params=build_cardholder_params(name, email, phone_number, address),
+            options=build_request_options(idempotency_key))
         return cardholder
+
+
+class AsyncStripeCardholderIssuer(AsyncCardholderIssuer):
+    def __init__(self, client):
+        self.client = client
+
+    async def create_cardholder(self, name: str, email: str, phone_number: str, address: str,
+                                idempotency_key: Optional[str] = None) -> dict:
+        return await self.client.issuing.cardholders.create_async(
+            params=build_cardholder_params(name, email, phone_number, address),
+            options=build_request_options(idempotency_key))
@@ -0,0 +1,55 @@
+"""
+Process-local metrics registry.
+
+Subsystems register a provider callable returning a dict of their current
+figures; ``GET /metrics`` renders a snapshot of every registered provider.
+"""
+import threading
+from collections import deque
+from typing import Callable, Dict
+
+_providers: Dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    _providers[name] = provider
+
+
+def snapshot() -> dict:
+    return {name: provider() for name, provider in _providers.items()}
+
+
+class LatencyRecorder:
+    """Keeps a count/total/max of observations plus a sliding window for percentiles."""
+
+    def __init__(self, window: int = 1024):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self.count, self.total, self.max
+
+        def percentile(p: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+        return {
+            "count": count,
+            "avg_ms": round(total / count * 1000, 3) if count else 0.0,
+            "p50_ms": round(percentile(0.50) * 1000, 3),
+            "p95_ms": round(percentile(0.95) * 1000, 3),
+            "max_ms": round(maximum * 1000, 3),
+        }
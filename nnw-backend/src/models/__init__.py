@@ -1,18 +1,66 @@
 from config import settings
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
+from models.pool_telemetry import InstrumentedAsyncQueuePool, pool_telemetry
 
 DATABASE_URL = settings.database_url
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _engine_kwargs(url: str) -> dict:
+    # The embedded SQLite stand-in used by tests keeps a single shared
+    # connection so an in-memory database survives across sessions. A file
+    # database gets a connection per session so concurrent transactions stay
+    # isolated (e.g. for nnw_backend/redemption_race.py).
+    if url.startswith("sqlite"):
+        if ":memory:" not in url:
+            return {"connect_args": {"check_same_thread": False}}
+        return {
+            "connect_args": {"check_same_thread": False},
+            "poolclass": StaticPool,
+        }
+    connect_args = {}
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        connect_args["server_settings"] = {
+            "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+    return {
+        "poolclass": InstrumentedAsyncQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": connect_args,
+    }
+
+
+engine = create_async_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+pool_telemetry.attach(engine)
+AsyncSessionLocal = async_sessionmaker(
+    engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
 
-def init_db():
+# Dependency: DB session shared by every router
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def init_db():
     from models.user import User
     from models.refresh_token import RefreshToken
     from models.profile import Profile
     from models.user_points import UserPoints
+    from models.points_ledger import PointsLedgerEntry
     from models.redeemed_rewards import RedeemedRewards
-    Base.metadata.create_all(bind=engine)
+    from models.reward import Reward
+    from models.cardholder import Cardholder
+    from models.cardholder_outbox import CardholderOutbox
+    from models.card_pool import CardPoolEntry
+    from models.webhook_event import WebhookEvent
+    from models.processed_event import ProcessedEvent
+    from models.user_import_job import UserImportJob
+    from models.revoked_session import RevokedSession
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
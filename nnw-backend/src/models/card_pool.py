@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, Index
+from models import Base
+
+
+class CardPoolEntry(Base):
+    """
+    Inactive virtual cards issued ahead of checkout, plus the checkout history
+    the replenisher uses to decide which cardholders are active.
+
+    ``available`` cards wait to be claimed; a claim flips the row to
+    ``claimed``. A checkout that found the pool empty is recorded as a
+    ``missed`` row without a card, so a cardholder's first checkout is what
+    starts their pool filling. A claimed card whose activation failed ends up
+    ``canceled``, or ``discard`` until the replenisher manages to cancel it;
+    the replenisher also discards the available cards of inactive
+    cardholders.
+    """
+    __tablename__ = "card_pool"
+    __table_args__ = (
+        Index("ix_card_pool_claim", "cardholder_id", "currency", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    cardholder_id = Column(String, nullable=False)
+    # Null for missed checkouts
+    card_id = Column(String, unique=True, nullable=True)
+    currency = Column(String, nullable=False)
+    # available -> claimed | canceled | discard, or missed
+    status = Column(String, nullable=False, default="available")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True, index=True)
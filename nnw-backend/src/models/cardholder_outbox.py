@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from models import Base
+
+
+class CardholderOutbox(Base):
+    """
+    Cardholders still to be provisioned with the card issuer. Rows are written
+    in the registration transaction and drained by CardholderOutboxWorker.
+    """
+    __tablename__ = "cardholder_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=False)
+    email = Column(String, nullable=False)
+    phone_number = Column(String, nullable=False)
+    address = Column(String, nullable=False)
+    # pending -> done, or failed once the retry budget is spent
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
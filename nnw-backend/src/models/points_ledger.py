@@ -0,0 +1,28 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Index, false
+from models import Base
+
+
+class PointsLedgerEntry(Base):
+    """
+    Append-only history of every change to a user's points. Rows are never
+    deleted, and the only update is compaction setting ``compacted`` once the
+    entry has been folded into the user's ``UserPoints`` snapshot.
+    """
+    __tablename__ = "points_ledger"
+    __table_args__ = (
+        Index("ix_points_ledger_user_id_id", "user_id", "id"),
+        # Balance reads and compaction only look at entries not yet folded in
+        Index("ix_points_ledger_uncompacted", "user_id", "id",
+              postgresql_where=Column("compacted") == false(),
+              sqlite_where=Column("compacted") == false()),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # credit, redemption or adjustment; amount is signed
+    kind = Column(String, nullable=False)
+    amount = Column(Float, nullable=False)
+    reference = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    compacted = Column(Boolean, nullable=False, default=False)
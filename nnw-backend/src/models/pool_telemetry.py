@@ -0,0 +1,82 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+import metrics
+
+
+class PoolTelemetry:
+    """Connection pool counters fed by SQLAlchemy pool events."""
+
+    def __init__(self):
+        self.pool = None
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.checkout_timeouts = 0
+        self.checkout_wait = metrics.LatencyRecorder()
+
+    def attach(self, engine) -> None:
+        self.pool = engine.sync_engine.pool
+        target = engine.sync_engine
+        event.listen(target, "connect", self._on_connect)
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+        event.listen(target, "invalidate", self._on_invalidate)
+        event.listen(target, "soft_invalidate", self._on_soft_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.invalidations += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception):
+        self.soft_invalidations += 1
+
+    def stats(self) -> dict:
+        stats = {
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "soft_invalidations": self.soft_invalidations,
+            "checkout_timeouts": self.checkout_timeouts,
+            "checkout_wait": self.checkout_wait.as_dict(),
+        }
+        if isinstance(self.pool, AsyncAdaptedQueuePool):
+            stats.update({
+                "size": self.pool.size(),
+                "checked_out": self.pool.checkedout(),
+                "checked_in": self.pool.checkedin(),
+                "overflow": self.pool.overflow(),
+            })
+        return stats
+
+
+pool_telemetry = PoolTelemetry()
+metrics.register("db_pool", pool_telemetry.stats)
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait to get a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_telemetry.checkout_timeouts += 1
+            raise
+        finally:
+            pool_telemetry.checkout_wait.observe(time.perf_counter() - start)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, String, DateTime
+from models import Base
+
+
+class ProcessedEvent(Base):
+    """
+    Stripe event ids that have been handled, kept for the redelivery window
+    so a redelivered event is recognised and skipped (see
+    workers/webhook_dedupe.py).
+    """
+    __tablename__ = "processed_events"
+
+    event_id = Column(String, primary_key=True)
+    event_type = Column(String, nullable=False)
+    processed_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, Float, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from models import Base
 from models.user import User
@@ -6,12 +6,20 @@ from models.user import User
 
 class RedeemedRewards(Base):
     __tablename__ = 'redeemed_rewards'
+    __table_args__ = (
+        # Client-supplied key; a retried redemption finds the original row
+        UniqueConstraint("user_id", "idempotency_key"),
+        # Serves the newest-first keyset pagination of a user's history
+        Index("ix_redeemed_rewards_user_id_redeemed_at", "user_id", "redeemed_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
+    reward_id = Column(Integer, ForeignKey('rewards.id'), nullable=True)
     reward_name = Column(String, index=True)
     reward_amount = Column(Float)
     needed_points = Column(Integer)
-    redeemed_at = Column(String)
+    redeemed_at = Column(DateTime, nullable=False)
+    idempotency_key = Column(String, nullable=True)
 
     user = relationship("User", back_populates="redeemed_rewards")
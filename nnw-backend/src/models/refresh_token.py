@@ -1,14 +1,21 @@
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
+from config import settings
 from models import Base
 
+PARTITIONED = settings.REFRESH_TOKENS_PARTITIONED
+
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    # Optional daily range partitions on Postgres so expired tokens can be
+    # dropped a whole partition at a time (see security/token_sweeper.py).
+    # Postgres requires the partition key to be part of the primary key.
+    __table_args__ = {"postgresql_partition_by": "RANGE (expires)"} if PARTITIONED else {}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     jti_hash = Column(String, nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires = Column(DateTime, nullable=False)
+    expires = Column(DateTime, nullable=False, index=True, primary_key=PARTITIONED)
 
     user = relationship("User", back_populates="refresh_tokens")
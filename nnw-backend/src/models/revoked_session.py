@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from models import Base
+
+
+class RevokedSession(Base):
+    """
+    Login sessions revoked before their access tokens expire (e.g. logout or
+    refresh-token reuse). Rows are only needed until ``expires``, the latest
+    moment an access token issued for the session could still be valid.
+    """
+    __tablename__ = "revoked_sessions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sid_hash = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expires = Column(DateTime, nullable=False, index=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,22 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime
+from models import Base
+
+
+class Reward(Base):
+    """
+    Rewards users can redeem points for. Rows are retired with ``active``
+    rather than deleted, and every write bumps ``updated_at``, so the
+    in-memory catalog can refresh incrementally (see rewards/catalog.py).
+    """
+    __tablename__ = "rewards"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    category = Column(String, nullable=False, index=True)
+    # The actual gift card amount (the value of the reward)
+    reward_amount = Column(Float, nullable=False)
+    needed_points = Column(Integer, nullable=False)
+    active = Column(Boolean, nullable=False, default=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow,
+                        onupdate=datetime.utcnow, index=True)
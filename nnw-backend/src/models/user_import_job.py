@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime
+from models import Base
+
+
+class UserImportJob(Base):
+    """
+    Progress of a bulk user import. ``rows_processed`` is committed together
+    with each batch of inserted users, so a resumed job continues exactly
+    after the last committed row.
+    """
+    __tablename__ = "user_import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_path = Column(String, nullable=False)
+    format = Column(String, nullable=False)  # "csv" or "ndjson"
+    rejects_path = Column(String, nullable=False)
+    # pending -> running -> completed, or failed (resumable); a running job
+    # whose updated_at is older than USER_IMPORT_LEASE_SECONDS is abandoned
+    status = Column(String, nullable=False, default="pending")
+    rows_processed = Column(Integer, nullable=False, default=0)
+    imported = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Doubles as the claim's lease: see workers/user_import.py
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __mapper_args__ = {
+        "version_id_col": updated_at,
+        "version_id_generator": lambda version: datetime.utcnow(),
+    }
@@ -7,11 +7,17 @@ from models.user import User
 
 
 class UserPoints(Base):
+    """
+    Balance snapshot per user: ``points`` is the sum of every ledger entry
+    marked ``compacted``. Rolled forward by points compaction;
+    ``last_entry_id`` is the highest entry id folded in so far.
+    """
     __tablename__ = 'user_points'
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'),
                      nullable=False, unique=True)
     points = Column(Float, default=0)
+    last_entry_id = Column(Integer, nullable=False, default=0)
 
     user = relationship("User", back_populates="user_points")
@@ -0,0 +1,23 @@
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from models import Base
+
+
+class WebhookEvent(Base):
+    """
+    Verified Stripe webhook events waiting to be handled. The listener writes
+    a row and acks straight away; WebhookEventWorker drains the queue and
+    deletes each row once its event has been handled.
+    """
+    __tablename__ = "webhook_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_id = Column(String, nullable=False, index=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(Text, nullable=False)
+    # pending, or failed (dead-lettered) once the retry budget is spent
+    status = Column(String, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = Column(String, nullable=True)
+    received_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -1,12 +1,74 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from models import init_db
-from routers import auth, card, user_points_router, rewards_router, profile
+import metrics
+from models import engine, init_db
+from bnpl.catalog import catalog_watcher
+from security.passwords import password_hasher
+from security.tokens import revocation_list, revocation_sync_task
+from security.token_sweeper import token_sweeper, token_sweeper_task
+from workers.cardholder_outbox import cardholder_outbox_task, cardholder_outbox_worker
+from workers.card_pool import card_pool, card_pool_replenisher
+from workers.webhook_events import webhook_event_task, webhook_event_worker
+from workers.webhook_dedupe import webhook_dedupe_pruner
+from integration.card.issuers import build_card_issuers
+from points.crediting import points_write_behind
+from points.compaction import points_compaction_task
+from points.balance_cache import balance_cache
+from rewards.catalog import rewards_catalog, rewards_catalog_refresher
+from config import settings
+from routers import (auth, card, user_points_router, rewards_router, rewards_admin, profile, user_import,
+                     stripe_webhook_listener)
 
 logging.basicConfig(level=logging.DEBUG)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await init_db()
+    await revocation_list.sync()
+    revocation_sync_task.start()
+    # First sweep also creates the upcoming partitions when partitioned
+    await token_sweeper.sweep()
+    token_sweeper_task.start()
+    catalog_watcher.start()
+    await password_hasher.start()
+    card_issuers = build_card_issuers()
+    await card_issuers.warm_up()
+    app.state.card_issuer = card_issuers.card
+    app.state.cardholder_issuer = card_issuers.cardholder
+    cardholder_outbox_worker.issuer = card_issuers.cardholder
+    cardholder_outbox_task.start()
+    card_pool.issuer = card_issuers.card
+    card_pool_replenisher.start()
+    webhook_event_worker.issuer = card_issuers.card
+    webhook_event_task.start()
+    webhook_dedupe_pruner.start()
+    points_compaction_task.start()
+    balance_cache.start()
+    await rewards_catalog.refresh()
+    rewards_catalog_refresher.start()
+    if settings.POINTS_WRITE_BEHIND:
+        points_write_behind.start()
+    yield
+    await points_write_behind.stop()
+    await rewards_catalog_refresher.stop()
+    await balance_cache.stop()
+    await points_compaction_task.stop()
+    await webhook_dedupe_pruner.stop()
+    await webhook_event_task.stop()
+    await card_pool_replenisher.stop()
+    await cardholder_outbox_task.stop()
+    await card_issuers.close()
+    await catalog_watcher.stop()
+    await token_sweeper_task.stop()
+    await revocation_sync_task.stop()
+    password_hasher.shutdown()
+    await engine.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Enable CORS
 origins = [
@@ -23,14 +85,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-init_db()
-
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(card.router)
+app.include_router(stripe_webhook_listener.router, tags=["webhooks"])
 app.include_router(user_points_router.router,
                    prefix="/user", tags=["user_points"])
 app.include_router(rewards_router.router, prefix="/rewards")
 app.include_router(profile.router, prefix="/profile")
+app.include_router(user_import.router, prefix="/admin/imports", tags=["admin"])
+app.include_router(rewards_admin.router, prefix="/admin/rewards", tags=["admin"])
 
 
 @app.get("/echo")
@@ -38,6 +101,11 @@ def echo(text: str = "Hello"):
     return {"echo": text}
 
 
+@app.get("/metrics")
+def get_metrics():
+    return metrics.snapshot()
+
+
 def main():
     import uvicorn
     uvicorn.run("nnw_backend.app:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,97 @@
+"""
+Load test for card creation.
+
+Keeps ``--concurrency`` POST /cards requests in flight against a running
+server while a probe calls GET /echo every ``--probe-interval`` seconds. If
+issuer calls blocked the event loop, probe latency would climb towards the
+issuer latency; with the async issuers it should stay near the baseline.
+Run the server with e.g. MOCK_ISSUER_LATENCY_SECONDS=0.5 to simulate a slow
+issuer.
+"""
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from typing import List
+
+import httpx
+
+
+def _summary(samples: List[float]) -> str:
+    if not samples:
+        return "no samples"
+    samples = sorted(samples)
+
+    def pct(p: float) -> float:
+        return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+    return (f"n={len(samples)} p50={pct(0.50):.1f}ms p95={pct(0.95):.1f}ms "
+            f"p99={pct(0.99):.1f}ms max={samples[-1] * 1000:.1f}ms")
+
+
+async def _probe(client: httpx.AsyncClient, interval: float, stop: asyncio.Event, samples: List[float]) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/echo")
+        samples.append(time.perf_counter() - start)
+        await asyncio.sleep(interval)
+
+
+async def _run(args) -> int:
+    body = {
+        "cardholder_id": args.cardholder_id,
+        "purchase_amount": 1000,
+        "merchant_id": args.merchant_id,
+    }
+    card_latency: List[float] = []
+    probe_latency: List[float] = []
+    statuses = defaultdict(int)
+    remaining = args.requests
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        baseline: List[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, args.probe_interval, stop, baseline))
+        await asyncio.sleep(1)
+        stop.set()
+        await probe
+
+        async def worker() -> None:
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.post("/cards", json=body)
+                card_latency.append(time.perf_counter() - start)
+                statuses[response.status_code] += 1
+
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, args.probe_interval, stop, probe_latency))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe
+
+    print(f"{args.requests} cards in {elapsed:.2f}s ({args.requests / elapsed:.1f}/s), statuses {dict(statuses)}")
+    print(f"POST /cards      {_summary(card_latency)}")
+    print(f"GET /echo idle   {_summary(baseline)}")
+    print(f"GET /echo loaded {_summary(probe_latency)}")
+    return 0 if set(statuses) == {200} else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test POST /cards and measure event-loop responsiveness.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--probe-interval", type=float, default=0.05)
+    parser.add_argument("--cardholder-id", default="mock_cardholder_load")
+    parser.add_argument("--merchant-id", default="load_test_merchant")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
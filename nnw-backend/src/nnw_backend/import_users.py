@@ -0,0 +1,51 @@
+import argparse
+import asyncio
+
+from models import engine, init_db
+from security.passwords import password_hasher
+from workers.user_import import ImportJobBusy, claim_job, create_job, detect_format, run_import
+
+
+async def _run(args) -> int:
+    await init_db()
+    # No interactive traffic here, so the import pool can take every core
+    if args.workers:
+        password_hasher.import_workers = args.workers
+    try:
+        if args.resume:
+            job_id = args.resume
+        else:
+            job = await create_job(args.path, args.format or detect_format(args.path))
+            job_id = job.id
+            print(f"Created import job {job_id}")
+        try:
+            await claim_job(job_id)
+        except ImportJobBusy as e:
+            print(f"{e}; not resuming")
+            return 1
+        job = await run_import(job_id)
+    finally:
+        password_hasher.shutdown()
+        await engine.dispose()
+
+    print(f"Job {job.id} {job.status}: {job.rows_processed} rows processed, "
+          f"{job.imported} imported, {job.rejected} rejected (see {job.rejects_path})")
+    if job.error:
+        print(f"Error: {job.error}. Resume with --resume {job.id}")
+    return 0 if job.status == "completed" else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users from a CSV or NDJSON file.")
+    parser.add_argument("path", nargs="?", help="CSV or NDJSON file of UserRegistration rows")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--resume", type=int, metavar="JOB_ID", help="resume a failed or interrupted job")
+    parser.add_argument("--workers", type=int, help="hashing processes (default PASSWORD_IMPORT_WORKERS)")
+    args = parser.parse_args()
+    if not args.path and not args.resume:
+        parser.error("a file path or --resume JOB_ID is required")
+    raise SystemExit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Concurrency harness for reward redemption.
+
+Fires many parallel redemptions at one user of a running server, with each
+idempotency key sent several times, then checks the invariants: the balance
+never goes negative, it drops by exactly the reward's ``needed_points`` per
+distinct successful key, and every retry of a key gets the same redemption back.
+"""
+import argparse
+import asyncio
+import uuid
+from collections import defaultdict
+
+import httpx
+
+
+async def _redeem(client: httpx.AsyncClient, args, key: str) -> httpx.Response:
+    return await client.post(
+        f"/rewards/{args.user_id}/redeemed-rewards",
+        json={"reward_id": args.reward_id},
+        headers={"Idempotency-Key": key},
+    )
+
+
+async def _balance(client: httpx.AsyncClient, user_id: int) -> float:
+    response = await client.get(f"/user/{user_id}/points")
+    return response.json()["points"] if response.status_code == 200 else 0.0
+
+
+async def _run(args) -> int:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        if args.seed_points:
+            await client.post(f"/user/{args.user_id}/add-points", json={"points_to_add": args.seed_points})
+        before = await _balance(client, args.user_id)
+        catalog = (await client.get("/rewards/catalog")).json()["rewards"]
+        reward = next((r for r in catalog if r["id"] == args.reward_id), None)
+        if reward is None:
+            print(f"Reward {args.reward_id} is not in the catalog")
+            return 1
+        needed_points = reward["needed_points"]
+
+        run_id = uuid.uuid4().hex[:8]
+        keys = [f"race-{run_id}-{i}" for i in range(args.requests) for _ in range(args.retries)]
+        responses = await asyncio.gather(*[_redeem(client, args, key) for key in keys])
+        after = await _balance(client, args.user_id)
+
+    ids_by_key = defaultdict(set)
+    statuses = defaultdict(int)
+    for key, response in zip(keys, responses):
+        statuses[response.status_code] += 1
+        if response.status_code == 200:
+            ids_by_key[key].add(response.json()["redemption_id"])
+
+    failures = []
+    if after < 0:
+        failures.append(f"balance went negative: {after}")
+    expected = before - len(ids_by_key) * needed_points
+    if abs(after - expected) > 1e-6:
+        failures.append(f"balance {after} != expected {expected} for {len(ids_by_key)} redemptions")
+    duplicated = [key for key, ids in ids_by_key.items() if len(ids) > 1]
+    if duplicated:
+        failures.append(f"{len(duplicated)} idempotency keys produced more than one redemption")
+
+    print(f"Sent {len(keys)} requests ({args.requests} keys x {args.retries}); statuses {dict(statuses)}")
+    print(f"Balance {before} -> {after}; {len(ids_by_key)} distinct redemptions")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire parallel redemptions at one user and check invariants.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--user-id", type=int, required=True)
+    parser.add_argument("--requests", type=int, default=100, help="distinct idempotency keys")
+    parser.add_argument("--retries", type=int, default=3, help="times each key is sent")
+    parser.add_argument("--reward-id", type=int, required=True, help="catalog reward to redeem")
+    parser.add_argument("--seed-points", type=float, default=0, help="credit this many points first")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(_run(args)))
+
+
+if __name__ == "__main__":
+    main()
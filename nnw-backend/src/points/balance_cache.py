@@ -0,0 +1,212 @@
+"""
+Read-through cache of user point balances.
+
+Each process keeps an LRU of balances with a TTL. Any write to a balance
+(credit, redemption) invalidates the entry locally and publishes the user id
+on an invalidation bus so every other process drops its copy too; the TTL
+only bounds staleness if a notification is lost.
+
+A generation counter per user with a load in flight closes the
+read/invalidate race: a miss notes the generation before reading the
+database and only stores its result if no invalidation arrived meanwhile.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import metrics
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+Loader = Callable[[int], Awaitable[Optional[float]]]
+
+
+class InvalidationBus(ABC):
+    @abstractmethod
+    async def publish(self, origin: str, user_id: int) -> None:
+        pass
+
+    @abstractmethod
+    async def listen(self, handler: Callable[[str, int], None]) -> None:
+        """Call ``handler(origin, user_id)`` for every message until cancelled."""
+        pass
+
+
+class LocalInvalidationBus(InvalidationBus):
+    """
+    In-process stand-in for pub/sub: fans messages out to every listener in
+    this process. Lets tests run several caches side by side as if they were
+    separate workers.
+    """
+    backend = "local"
+
+    def __init__(self):
+        self._queues: List[asyncio.Queue] = []
+
+    async def publish(self, origin: str, user_id: int) -> None:
+        for queue in self._queues:
+            queue.put_nowait((origin, user_id))
+
+    async def listen(self, handler: Callable[[str, int], None]) -> None:
+        queue = asyncio.Queue()
+        self._queues.append(queue)
+        try:
+            while True:
+                handler(*await queue.get())
+        finally:
+            self._queues.remove(queue)
+
+
+class RedisInvalidationBus(InvalidationBus):
+    backend = "redis"
+    channel = "points:balance-invalidations"
+
+    def __init__(self, redis_url: str):
+        import redis.asyncio as redis
+        self.client = redis.from_url(redis_url)
+
+    async def publish(self, origin: str, user_id: int) -> None:
+        await self.client.publish(self.channel, json.dumps({"origin": origin, "user_id": user_id}))
+
+    async def listen(self, handler: Callable[[str, int], None]) -> None:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    payload = json.loads(message["data"])
+                    handler(payload["origin"], payload["user_id"])
+        finally:
+            await pubsub.aclose()
+
+
+class BalanceCache:
+    def __init__(self, bus: InvalidationBus, ttl_seconds: float, max_entries: int):
+        self.bus = bus
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.origin = uuid.uuid4().hex
+        # user_id -> (balance, cached_at)
+        self._entries: "OrderedDict[int, Tuple[float, float]]" = OrderedDict()
+        # user_id -> (loads in flight, generation), only while loads are in flight
+        self._loading: Dict[int, Tuple[int, int]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.local_invalidations = 0
+        self.remote_invalidations = 0
+        self.staleness = metrics.LatencyRecorder()
+
+    def start(self) -> None:
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(), name="balance-cache-invalidations")
+
+    async def stop(self) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                await self.bus.listen(self._on_message)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # Entries may have missed invalidations while disconnected
+                logger.exception("Balance invalidation listener failed; clearing cache")
+                self._entries.clear()
+                await asyncio.sleep(1)
+
+    def _on_message(self, origin: str, user_id: int) -> None:
+        if origin != self.origin:
+            self.remote_invalidations += 1
+            self._drop(user_id)
+
+    def _drop(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+        if user_id in self._loading:
+            loads, generation = self._loading[user_id]
+            self._loading[user_id] = (loads, generation + 1)
+
+    def _lookup(self, user_id: int) -> Optional[float]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        balance, cached_at = entry
+        age = time.monotonic() - cached_at
+        if age > self.ttl_seconds:
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        self.staleness.observe(age)
+        return balance
+
+    async def get(self, user_id: int, loader: Loader) -> Optional[float]:
+        """Return the cached balance, or load it with ``loader`` and cache it."""
+        balance = self._lookup(user_id)
+        if balance is not None:
+            self.hits += 1
+            return balance
+        self.misses += 1
+        loads, generation = self._loading.get(user_id, (0, 0))
+        self._loading[user_id] = (loads + 1, generation)
+        try:
+            balance = await loader(user_id)
+        finally:
+            loads, current = self._loading.pop(user_id)
+            if loads > 1:
+                self._loading[user_id] = (loads - 1, current)
+        if balance is not None and current == generation:
+            self._entries[user_id] = (balance, time.monotonic())
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return balance
+
+    async def invalidate(self, user_id: int) -> None:
+        """Drop the user's balance here and in every other process."""
+        self.local_invalidations += 1
+        self._drop(user_id)
+        try:
+            await self.bus.publish(self.origin, user_id)
+        except Exception:
+            logger.exception("Failed to publish balance invalidation for user %s", user_id)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "bus": self.bus.backend,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "local_invalidations": self.local_invalidations,
+            "remote_invalidations": self.remote_invalidations,
+            # Age of the entries served on hits
+            "staleness": self.staleness.as_dict(),
+        }
+
+
+def build_invalidation_bus() -> InvalidationBus:
+    if settings.POINTS_BALANCE_BUS == "redis":
+        return RedisInvalidationBus(settings.REDIS_URL)
+    return LocalInvalidationBus()
+
+
+balance_cache = BalanceCache(
+    build_invalidation_bus(),
+    settings.POINTS_BALANCE_CACHE_TTL_SECONDS,
+    settings.POINTS_BALANCE_CACHE_MAX_ENTRIES,
+)
+metrics.register("points_balance_cache", balance_cache.stats)
@@ -0,0 +1,108 @@
+"""
+Rolls the points ledger forward into the ``UserPoints`` snapshots.
+
+Each run marks a batch of uncompacted ledger entries as ``compacted`` with
+one ``UPDATE ... RETURNING``, sums exactly the returned rows per user and
+adds the sums to the snapshots, all in one transaction. Only rows the
+UPDATE actually marked are folded in, so an entry whose transaction commits
+after higher ids have been compacted is still unmarked and is picked up by
+the next run; balance reads see either the unmarked entry or the snapshot
+that includes it, never both or neither. On Postgres a transaction-scoped
+advisory lock keeps two instances from compacting at once.
+"""
+import time
+from collections import defaultdict
+
+from sqlalchemy import case, false, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal, engine
+from models.points_ledger import PointsLedgerEntry
+from models.user_points import UserPoints
+from workers.periodic import PeriodicTask
+
+# Arbitrary application-wide key for pg_try_advisory_xact_lock
+COMPACTION_LOCK_KEY = 0x706F696E7473
+
+
+class PointsCompactor:
+    def __init__(self):
+        self.runs = 0
+        self.entries_compacted = 0
+        self.snapshots_updated = 0
+        self.duration = metrics.LatencyRecorder()
+
+    async def compact(self) -> int:
+        """Compact up to one batch of entries; returns how many were folded in."""
+        start = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            if engine.dialect.name == "postgresql" and not await db.scalar(
+                    text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": COMPACTION_LOCK_KEY}):
+                return 0
+            batch = (
+                select(PointsLedgerEntry.id)
+                .where(PointsLedgerEntry.compacted == false())
+                .order_by(PointsLedgerEntry.id)
+                .limit(settings.POINTS_COMPACTION_BATCH_ENTRIES)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            marked = (await db.execute(
+                update(PointsLedgerEntry)
+                .where(PointsLedgerEntry.id.in_(batch), PointsLedgerEntry.compacted == false())
+                .values(compacted=True)
+                .returning(PointsLedgerEntry.user_id, PointsLedgerEntry.id, PointsLedgerEntry.amount)
+            )).all()
+            if not marked:
+                return 0
+
+            totals = defaultdict(float)
+            last_ids = defaultdict(int)
+            for user_id, entry_id, amount in marked:
+                totals[user_id] += amount
+                last_ids[user_id] = max(last_ids[user_id], entry_id)
+
+            insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+            stmt = insert(UserPoints).values([
+                {"user_id": user_id, "points": points, "last_entry_id": last_ids[user_id]}
+                for user_id, points in totals.items()
+            ])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[UserPoints.user_id],
+                set_={
+                    "points": UserPoints.points + stmt.excluded.points,
+                    # A late-committing entry can have a lower id than ones already folded in
+                    "last_entry_id": case(
+                        (stmt.excluded.last_entry_id > UserPoints.last_entry_id, stmt.excluded.last_entry_id),
+                        else_=UserPoints.last_entry_id,
+                    ),
+                },
+            )
+            await db.execute(stmt)
+            await db.commit()
+
+        self.runs += 1
+        self.entries_compacted += len(marked)
+        self.snapshots_updated += len(totals)
+        self.duration.observe(time.perf_counter() - start)
+        return len(marked)
+
+    async def run(self) -> None:
+        while await self.compact() >= settings.POINTS_COMPACTION_BATCH_ENTRIES:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "entries_compacted": self.entries_compacted,
+            "snapshots_updated": self.snapshots_updated,
+            "duration": self.duration.as_dict(),
+        }
+
+
+points_compactor = PointsCompactor()
+points_compaction_task = PeriodicTask(
+    "points-compaction", settings.POINTS_COMPACTION_INTERVAL_SECONDS, points_compactor.run)
+metrics.register("points_compaction", points_compactor.stats)
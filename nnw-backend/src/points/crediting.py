@@ -0,0 +1,151 @@
+"""
+Point crediting.
+
+A credit is one appended ``points_ledger`` row; no per-user row is read or
+locked, so concurrent credits never race or queue behind each other. The new
+balance returned to the caller is the snapshot-plus-delta read in the same
+transaction.
+
+``PointsWriteBehind`` optionally sits in front of it for high-volume callers
+(e.g. bulk cashback jobs): credits queued within a flush interval are written
+as one batched ledger insert, and every caller's future resolves with the
+balance read back after that flush commits.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from points.ledger import CREDIT, get_balances, record_entries
+
+logger = logging.getLogger(__name__)
+
+
+async def credit_many(db: AsyncSession, credits: List[Tuple[int, float]]) -> Dict[int, float]:
+    """Append ``(user_id, amount)`` credits in one insert and return the new balances."""
+    await record_entries(db, [
+        {"user_id": user_id, "kind": CREDIT, "amount": amount} for user_id, amount in credits])
+    return await get_balances(db, [user_id for user_id, _ in credits])
+
+
+async def credit_points(db: AsyncSession, user_id: int, amount: float) -> float:
+    """Credit one user and return their new balance; the caller commits."""
+    return (await credit_many(db, [(user_id, amount)]))[user_id]
+
+
+class PointsWriteBehind:
+    """
+    Buffers credits and flushes them every ``POINTS_FLUSH_INTERVAL_MS`` (or
+    sooner once ``POINTS_FLUSH_MAX_ENTRIES`` are pending).
+
+    Callers await their credit, so a response is only sent once the flush
+    holding it has committed. If a flush fails (typically an unknown user id
+    tripping the foreign key) its credits are retried one by one so a bad
+    credit cannot fail the rest of the batch.
+    """
+
+    def __init__(self):
+        self._pending: List[Tuple[int, float, asyncio.Future]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.credits = 0
+        self.flushes = 0
+        self.flush_latency = metrics.LatencyRecorder()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run(), name="points-write-behind")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        # Don't strand callers that queued after the last tick
+        await self.flush()
+
+    async def credit(self, user_id: int, amount: float) -> float:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((user_id, amount, future))
+        self.credits += 1
+        if len(self._pending) >= settings.POINTS_FLUSH_MAX_ENTRIES:
+            self._wakeup.set()
+        return await future
+
+    async def _run(self) -> None:
+        interval = settings.POINTS_FLUSH_INTERVAL_MS / 1000
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Points write-behind flush failed")
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        start = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                balances = await credit_many(db, [(user_id, amount) for user_id, amount, _ in batch])
+                await db.commit()
+        except IntegrityError:
+            await self._flush_individually(batch)
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            raise
+        else:
+            for user_id, _, future in batch:
+                if not future.done():
+                    future.set_result(balances[user_id])
+        self.flushes += 1
+        self.flush_latency.observe(time.perf_counter() - start)
+
+    async def _flush_individually(self, batch) -> None:
+        for user_id, amount, future in batch:
+            try:
+                async with AsyncSessionLocal() as db:
+                    balance = await credit_points(db, user_id, amount)
+                    await db.commit()
+            except Exception as exc:
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                if not future.done():
+                    future.set_result(balance)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "credits": self.credits,
+            "flushes": self.flushes,
+            "credits_per_flush": round(self.credits / self.flushes, 3) if self.flushes else 0.0,
+            "pending": len(self._pending),
+            "flush": self.flush_latency.as_dict(),
+        }
+
+
+points_write_behind = PointsWriteBehind()
+metrics.register("points_write_behind", points_write_behind.stats)
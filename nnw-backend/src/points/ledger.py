@@ -0,0 +1,58 @@
+"""
+Points ledger reads and writes.
+
+Every change to a balance is appended to ``points_ledger``; nothing updates a
+shared per-user row, so concurrent credits for a hot user never wait on each
+other. A balance is the user's ``UserPoints`` snapshot plus the sum of the
+entries not yet compacted into it, read in a single statement so a
+compaction committing mid-read cannot double count.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import false, func, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.points_ledger import PointsLedgerEntry
+from models.user_points import UserPoints
+
+CREDIT = "credit"
+REDEMPTION = "redemption"
+ADJUSTMENT = "adjustment"
+
+
+async def record_entries(db: AsyncSession, entries: List[dict]) -> None:
+    """
+    Append ``entries`` (dicts of user_id, kind, amount and optionally
+    reference) as one batched insert; the caller commits.
+    """
+    if entries:
+        await db.execute(insert(PointsLedgerEntry), entries)
+
+
+def _balance_rows(user_ids: List[int]):
+    """Snapshot points plus every ledger entry not yet folded into it, per user."""
+    snapshots = select(UserPoints.user_id, UserPoints.points.label("amount")).where(
+        UserPoints.user_id.in_(user_ids))
+    recent = select(PointsLedgerEntry.user_id, PointsLedgerEntry.amount).where(
+        PointsLedgerEntry.user_id.in_(user_ids),
+        PointsLedgerEntry.compacted == false(),
+    )
+    return union_all(snapshots, recent).subquery()
+
+
+def balance_expression(user_id: int):
+    """Scalar SQL expression for one user's balance, for use inside other statements."""
+    rows = _balance_rows([user_id])
+    return select(func.coalesce(func.sum(rows.c.amount), 0)).scalar_subquery()
+
+
+async def get_balances(db: AsyncSession, user_ids: Iterable[int]) -> Dict[int, float]:
+    """Current balance per user; users with no snapshot and no entries are omitted."""
+    rows = _balance_rows(list(set(user_ids)))
+    result = await db.execute(
+        select(rows.c.user_id, func.sum(rows.c.amount)).group_by(rows.c.user_id))
+    return {user_id: balance or 0.0 for user_id, balance in result.all()}
+
+
+async def get_balance(db: AsyncSession, user_id: int) -> Optional[float]:
+    return (await get_balances(db, [user_id])).get(user_id)
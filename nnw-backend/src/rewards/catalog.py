@@ -0,0 +1,145 @@
+"""
+In-memory rewards catalog.
+
+Active rewards are held as an array sorted by ``needed_points`` (globally and
+per category), so "what can N points buy?" is a binary search for the cut-off
+followed by a slice, and redemption validates a reward id with one dict
+lookup. Refreshes re-read rows updated since the newest ``updated_at``
+already seen minus ``REWARDS_CATALOG_REFRESH_OVERLAP_SECONDS``: ``updated_at``
+is set at flush, so an admin write that commits after a newer one still falls
+inside the overlap, and re-applying a row is harmless. Every
+``REWARDS_CATALOG_FULL_RELOAD_SECONDS`` the whole table is reloaded, which
+also covers a transaction slower than the overlap. When anything changed the
+arrays are rebuilt and swapped in as a whole, so readers never see a
+half-updated index.
+"""
+import bisect
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from models.reward import Reward
+from rewards.schemas import CatalogReward
+from workers.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+class _SortedRewards:
+    def __init__(self, rewards: List[CatalogReward]):
+        self.rewards = sorted(rewards, key=lambda r: (r.needed_points, r.id))
+        self.points = [r.needed_points for r in self.rewards]
+
+    def affordable(self, points: float) -> List[CatalogReward]:
+        return self.rewards[:bisect.bisect_right(self.points, points)]
+
+
+class CatalogIndex:
+    def __init__(self, rewards: Dict[int, CatalogReward]):
+        self.by_id = rewards
+        self.all = _SortedRewards(list(rewards.values()))
+        by_category: Dict[str, List[CatalogReward]] = {}
+        for reward in rewards.values():
+            by_category.setdefault(reward.category, []).append(reward)
+        self.by_category = {category: _SortedRewards(items) for category, items in by_category.items()}
+
+
+class RewardsCatalog:
+    def __init__(self):
+        self.index = CatalogIndex({})
+        self._watermark: Optional[datetime] = None
+        self._last_full_reload = 0.0
+        self.refreshes = 0
+        self.full_reloads = 0
+        self.rows_applied = 0
+        self.refreshed_at = 0.0
+        self.refresh_latency = metrics.LatencyRecorder()
+
+    def get(self, reward_id: int) -> Optional[CatalogReward]:
+        return self.index.by_id.get(reward_id)
+
+    def affordable(self, points: Optional[float] = None, category: Optional[str] = None) -> List[CatalogReward]:
+        """Active rewards costing at most ``points`` (all if None), cheapest first."""
+        index = self.index
+        rewards = index.all if category is None else index.by_category.get(category)
+        if rewards is None:
+            return []
+        if points is None:
+            return list(rewards.rewards)
+        return rewards.affordable(points)
+
+    def categories(self) -> List[str]:
+        return sorted(self.index.by_category)
+
+    async def refresh(self) -> None:
+        start = time.perf_counter()
+        full = (self._watermark is None or time.monotonic() - self._last_full_reload
+                >= settings.REWARDS_CATALOG_FULL_RELOAD_SECONDS)
+        query = select(Reward)
+        if not full:
+            overlap = timedelta(seconds=settings.REWARDS_CATALOG_REFRESH_OVERLAP_SECONDS)
+            query = query.where(Reward.updated_at >= self._watermark - overlap)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(query)).all()
+
+        self.refreshes += 1
+        self.refreshed_at = time.time()
+        if rows or full:
+            self._apply(rows, full)
+        if self._watermark is None:
+            # Empty table; later rows are all newer than this
+            self._watermark = datetime.utcnow()
+        if full:
+            self._last_full_reload = time.monotonic()
+            self.full_reloads += 1
+        self.refresh_latency.observe(time.perf_counter() - start)
+
+    def _apply(self, rows: List[Reward], full: bool) -> None:
+        rewards = dict(self.index.by_id)
+        changed = 0
+        if full:
+            # Anything the table no longer has drops out
+            present = {row.id for row in rows}
+            for reward_id in [r for r in rewards if r not in present]:
+                del rewards[reward_id]
+                changed += 1
+        for row in rows:
+            reward = CatalogReward.model_validate(row) if row.active else None
+            if rewards.get(row.id) == reward:
+                continue
+            changed += 1
+            if reward is None:
+                del rewards[row.id]
+            else:
+                rewards[row.id] = reward
+        if changed:
+            self.index = CatalogIndex(rewards)
+            self.rows_applied += changed
+        if not rows:
+            return
+        latest = max(row.updated_at for row in rows)
+        if self._watermark is None or latest > self._watermark:
+            self._watermark = latest
+
+    def stats(self) -> dict:
+        return {
+            "rewards": len(self.index.by_id),
+            "categories": len(self.index.by_category),
+            "refreshes": self.refreshes,
+            "full_reloads": self.full_reloads,
+            "rows_applied": self.rows_applied,
+            "refreshed_at": self.refreshed_at,
+            "refresh": self.refresh_latency.as_dict(),
+        }
+
+
+rewards_catalog = RewardsCatalog()
+rewards_catalog_refresher = PeriodicTask(
+    "rewards-catalog-refresh", settings.REWARDS_CATALOG_REFRESH_SECONDS, rewards_catalog.refresh)
+metrics.register("rewards_catalog", rewards_catalog.stats)
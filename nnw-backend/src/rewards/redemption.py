@@ -0,0 +1,122 @@
+"""
+Race-free, idempotent reward redemption.
+
+The points are deducted by a single ``INSERT INTO points_ledger ... SELECT
+... WHERE <balance> >= needed_points`` statement, so the balance check and
+the debit cannot be split by a concurrent redemption. On Postgres, READ
+COMMITTED would still let two such statements see the same balance, so
+redemptions for a user are first serialized with a transaction-scoped
+advisory lock; SQLite serializes writers on its own.
+
+An optional idempotency key, unique per user, makes retries return the
+original redemption instead of debiting twice.
+"""
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import insert, literal, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import metrics
+from models.points_ledger import PointsLedgerEntry
+from models.redeemed_rewards import RedeemedRewards
+from points.ledger import REDEMPTION, balance_expression
+from rewards.schemas import CatalogReward
+
+# Namespace for the two-key form of pg_advisory_xact_lock(namespace, user_id)
+REDEMPTION_LOCK_NAMESPACE = 0x72656465
+
+
+class InsufficientPoints(Exception):
+    pass
+
+
+class RedemptionStats:
+    def __init__(self):
+        self.redeemed = 0
+        self.replayed = 0
+        self.rejected = 0
+        self.lock_wait = metrics.LatencyRecorder()
+
+    def as_dict(self) -> dict:
+        return {
+            "redeemed": self.redeemed,
+            "replayed": self.replayed,
+            "rejected": self.rejected,
+            "lock_wait": self.lock_wait.as_dict(),
+        }
+
+
+redemption_stats = RedemptionStats()
+metrics.register("rewards_redemption", redemption_stats.as_dict)
+
+
+async def _find_by_key(db: AsyncSession, user_id: int, idempotency_key: str) -> Optional[RedeemedRewards]:
+    return await db.scalar(select(RedeemedRewards).where(
+        RedeemedRewards.user_id == user_id,
+        RedeemedRewards.idempotency_key == idempotency_key))
+
+
+async def redeem(
+    db: AsyncSession,
+    user_id: int,
+    reward: CatalogReward,
+    idempotency_key: Optional[str] = None,
+) -> Tuple[RedeemedRewards, bool]:
+    """
+    Debit the reward's ``needed_points`` and record it in one transaction.
+
+    Returns the redemption and whether it was a replay of an earlier request
+    with the same idempotency key. Raises InsufficientPoints when the
+    balance does not cover the reward.
+    """
+    if db.bind.dialect.name == "postgresql":
+        start = time.perf_counter()
+        await db.execute(text("SELECT pg_advisory_xact_lock(:namespace, :user_id)"),
+                         {"namespace": REDEMPTION_LOCK_NAMESPACE, "user_id": user_id})
+        redemption_stats.lock_wait.observe(time.perf_counter() - start)
+
+    if idempotency_key:
+        existing = await _find_by_key(db, user_id, idempotency_key)
+        if existing:
+            # Detach first so ending the transaction doesn't expire it
+            db.expunge(existing)
+            await db.rollback()
+            redemption_stats.replayed += 1
+            return existing, True
+
+    debit = select(
+        literal(user_id), literal(REDEMPTION), literal(-reward.needed_points),
+        literal(reward.name), literal(datetime.utcnow()),
+    ).where(balance_expression(user_id) >= reward.needed_points)
+    result = await db.execute(insert(PointsLedgerEntry).from_select(
+        ["user_id", "kind", "amount", "reference", "created_at"], debit))
+    if result.rowcount == 0:
+        await db.rollback()
+        redemption_stats.rejected += 1
+        raise InsufficientPoints()
+
+    redemption = RedeemedRewards(
+        user_id=user_id,
+        reward_id=reward.id,
+        reward_name=reward.name,
+        reward_amount=reward.reward_amount,
+        needed_points=reward.needed_points,
+        redeemed_at=datetime.now(),
+        idempotency_key=idempotency_key,
+    )
+    db.add(redemption)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Lost a race on the idempotency key; the debit is rolled back with it
+        await db.rollback()
+        existing = await _find_by_key(db, user_id, idempotency_key) if idempotency_key else None
+        if existing is None:
+            raise
+        redemption_stats.replayed += 1
+        return existing, True
+    redemption_stats.redeemed += 1
+    return redemption, False
@@ -0,0 +1,18 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class CatalogReward(BaseModel):
+    id: int
+    name: str
+    category: str
+    reward_amount: float
+    needed_points: int
+
+    model_config = {"from_attributes": True, "frozen": True}
+
+
+class AffordableRewardsResponse(BaseModel):
+    points: Optional[float] = None
+    category: Optional[str] = None
+    rewards: List[CatalogReward]
@@ -1,35 +1,34 @@
 import uuid
-import hashlib
-import jwt
 
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, date, timedelta
-from fastapi import APIRouter, HTTPException, Depends
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Body, HTTPException, Depends
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import SessionLocal
+from models import get_db
 from models.user import User
 from models.profile import Profile
-from models.cardholder import Cardholder
-
-from integration.card.cardholder import CardholderIssuer
-from integration.card.mock_cardholder import MockCardholderIssuer
-from integration.card.stripe_cardholder import StripeCardholderIssuer
-
-from config import settings
+from models.cardholder_outbox import CardholderOutbox
+from models.refresh_token import RefreshToken
+from models.revoked_session import RevokedSession
+
+from security.passwords import PasswordHashingSaturated, password_hasher
+from security.tokens import (
+    REFRESH_TOKEN_EXPIRE_DAYS,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    get_current_user_id,
+    hash_jti,
+    revocation_list,
+    rotate_refresh_token,
+)
 
 router = APIRouter()
 
-# Configuration
-JWT_SECRET = settings.JWT_SECRET
-STRIPE_API_KEY = settings.STRIPE_API_KEY
-JWT_ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 15
-REFRESH_TOKEN_EXPIRE_DAYS = 7
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 class TokenResponse(BaseModel):
     access_token: str
@@ -48,65 +47,64 @@ class UserRegistration(BaseModel):
     monthly_income: float
     monthly_expenses: float
 
-# Dependency: DB session
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Utility functions
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHashingSaturated:
+        raise HTTPException(
+            status_code=503, detail="Server busy, please retry shortly")
 
 
-# def create_refresh_token(user_id: int):
-#     jti = str(uuid.uuid4())
-#     expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-#     payload = {"user_id": user_id, "jti": jti, "exp": expire}
-#     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
-#     return token, jti, expire
+async def verify_password(user: User, plain_password: str) -> bool:
+    """
+    Verify the user's password, replacing the stored hash when it was made
+    with a different bcrypt cost. The caller commits the session.
+    """
+    try:
+        verified, new_hash = await password_hasher.verify(
+            plain_password, user.hashed_password)
+    except PasswordHashingSaturated:
+        raise HTTPException(
+            status_code=503, detail="Server busy, please retry shortly")
+    if verified and new_hash:
+        user.hashed_password = new_hash
+    return verified
 
 
-def hash_jti(jti: str) -> str:
-    return hashlib.sha256(jti.encode()).hexdigest()
+async def issue_tokens(db: AsyncSession, user_id: int, sid: str) -> TokenResponse:
+    """
+    Create an access/refresh token pair for the session and stage the refresh
+    token's record; the caller commits.
+    """
+    access_token = create_access_token({"user_id": user_id, "sid": sid})
+    refresh_token, jti, expires = create_refresh_token(user_id, sid)
+    db.add(RefreshToken(jti_hash=hash_jti(jti), user_id=user_id, expires=expires))
+    return TokenResponse(access_token=access_token, refresh_token=refresh_token)
 
 
-def get_cardholder_issuer() -> CardholderIssuer:
-    if settings.ENV == "production":
-        return StripeCardholderIssuer(STRIPE_API_KEY)
-    return MockCardholderIssuer()
+def revoke_session(db: AsyncSession, user_id: int, sid: str) -> None:
+    # Outlives every refresh token the session could still hold
+    expires = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    sid_hash = hash_jti(sid)
+    db.add(RevokedSession(sid_hash=sid_hash, user_id=user_id, expires=expires))
+    revocation_list.add(sid_hash, expires)
 
 
 @router.post("/register")
-def register(reg_data: UserRegistration, db: Session = Depends(get_db)):
+async def register(reg_data: UserRegistration, db: AsyncSession = Depends(get_db)):
 
-    existing = db.query(User).filter(User.email == reg_data.email).first()
+    existing = await db.scalar(select(User).where(User.email == reg_data.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create the user record
-    hashed_pw = get_password_hash(reg_data.password)
+    hashed_pw = await get_password_hash(reg_data.password)
     new_user = User(email=reg_data.email, hashed_password=hashed_pw)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.flush()
 
     # Create the profile record referencing the new user
     profile = Profile(
@@ -120,90 +118,80 @@ def register(reg_data: UserRegistration, db: Session = Depends(get_db)):
         monthly_expenses=reg_data.monthly_expenses
     )
     db.add(profile)
-    db.commit()
-    # Create a cardholder using the Stripe integration
+
+    # Queue the cardholder for the issuer; the outbox worker provisions it
+    db.add(CardholderOutbox(
+        user_id=new_user.id,
+        name=reg_data.name,
+        email=reg_data.email,
+        phone_number=reg_data.mobile,
+        address=reg_data.address,
+    ))
+
     try:
-        cardholder_service = get_cardholder_issuer()
-        cardholder_data = cardholder_service.create_cardholder(
-            name=reg_data.name,
-            email=reg_data.email,
-            phone_number=reg_data.mobile,
-            address=reg_data.address
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    return {"message": "User registered, cardholder provisioning queued", "user_id": new_user.id}
+
+
+@router.post("/login", response_model=TokenResponse)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user or not await verify_password(user, form_data.password):
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    tokens = await issue_tokens(db, user.id, str(uuid.uuid4()))
+    await db.commit()
+    return tokens
+
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(refresh_token: str = Body(..., embed=True), db: AsyncSession = Depends(get_db)):
+    payload = decode_token(refresh_token, "refresh")
+    user_id, sid, jti = payload["user_id"], payload["sid"], payload.get("jti")
+    if not jti:
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    if revocation_list.is_revoked(sid):
+        raise HTTPException(status_code=401, detail="Session revoked")
+
+    # Rotate refresh token: the old record is consumed and its replacement
+    # written in one statement.
+    new_refresh_token = await rotate_refresh_token(db, user_id, sid, jti)
+    if new_refresh_token:
+        await db.commit()
+        return TokenResponse(
+            access_token=create_access_token({"user_id": user_id, "sid": sid}),
+            refresh_token=new_refresh_token,
         )
-    except Exception as e:
-        raise HTTPException(
-            status_code=500, detail=f"Error creating cardholder: {str(e)}")
 
-    # Persist the cardholder information in our new table
-    new_cardholder = Cardholder(
-        user_id=new_user.id,
-        cardholder_id=cardholder_data["id"],
-        provider="stripe",
-    )
-    db.add(new_cardholder)
-    db.commit()
-
-    return {"message": "User registered with profile and cardholder", "user_id": new_user.id}
-
-
-# @router.post("/login", response_model=TokenResponse)
-# def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-#     user = db.query(UserRegistration).filter(
-#         UserRegistration.email == form_data.username).first()
-#     if not user or not verify_password(form_data.password, user.hashed_password):
-#         raise HTTPException(status_code=401, detail="Invalid credentials")
-
-#     token_data = {"user_id": user.id}
-#     access_token = create_access_token(token_data)
-
-#     refresh_token, jti, expires = create_refresh_token(user.id)
-#     token_record = RefreshToken(jti_hash=hash_jti(
-#         jti), user_id=user.id, expires=expires)
-#     db.add(token_record)
-#     db.commit()
-
-#     return TokenResponse(access_token=access_token, refresh_token=refresh_token)
-
-
-# @router.post("/refresh", response_model=TokenResponse)
-# def refresh(refresh_token: str = Body(...), db: Session = Depends(get_db)):
-#     try:
-#         payload = jwt.decode(refresh_token, JWT_SECRET,
-#                              algorithms=[JWT_ALGORITHM])
-#         user_id = payload.get("user_id")
-#         jti = payload.get("jti")
-#         if not user_id or not jti:
-#             raise HTTPException(
-#                 status_code=401, detail="Invalid token payload")
-#     except jwt.ExpiredSignatureError:
-#         raise HTTPException(status_code=401, detail="Refresh token expired")
-#     except jwt.PyJWTError:
-#         raise HTTPException(status_code=401, detail="Invalid refresh token")
-
-#     token_hash_val = hash_jti(jti)
-#     token_record = db.query(RefreshToken).filter(
-#         RefreshToken.user_id == user_id,
-#         RefreshToken.jti_hash == token_hash_val
-#     ).first()
-
-#     if not token_record:
-#         raise HTTPException(
-#             status_code=401, detail="Refresh token not recognized")
-#     if token_record.expires < datetime.utcnow():
-#         db.delete(token_record)
-#         db.commit()
-#         raise HTTPException(status_code=401, detail="Refresh token expired")
-
-#     # Rotate refresh token: delete old token record.
-#     db.delete(token_record)
-#     db.commit()
-
-#     token_data = {"user_id": user_id}
-#     new_access_token = create_access_token(token_data)
-#     new_refresh_token, new_jti, new_expires = create_refresh_token(user_id)
-#     new_token_record = RefreshToken(jti_hash=hash_jti(
-#         new_jti), user_id=user_id, expires=new_expires)
-#     db.add(new_token_record)
-#     db.commit()
-
-#     return TokenResponse(access_token=new_access_token, refresh_token=new_refresh_token)
+    token_record = await db.scalar(select(RefreshToken).where(
+        RefreshToken.jti_hash == hash_jti(jti)))
+    if token_record and token_record.user_id == user_id:
+        await db.delete(token_record)
+        await db.commit()
+        raise HTTPException(status_code=401, detail="Refresh token expired")
+
+    # A correctly signed but already-rotated token means it was replayed:
+    # revoke the whole session.
+    revoke_session(db, user_id, sid)
+    await db.commit()
+    raise HTTPException(status_code=401, detail="Refresh token not recognized")
+
+
+@router.post("/logout")
+async def logout(refresh_token: str = Body(..., embed=True), db: AsyncSession = Depends(get_db)):
+    payload = decode_token(refresh_token, "refresh")
+    token_record = await db.scalar(select(RefreshToken).where(
+        RefreshToken.jti_hash == hash_jti(payload.get("jti", ""))))
+    if token_record:
+        await db.delete(token_record)
+    revoke_session(db, payload["user_id"], payload["sid"])
+    await db.commit()
+    return {"message": "Logged out"}
+
+
+@router.get("/me")
+def me(user_id: int = Depends(get_current_user_id)):
+    return {"user_id": user_id}
@@ -1,10 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from typing import List, Optional
-from config import settings
-from integration.card.card_issuer import CardIssuer
-from integration.card.mock_card_issuer import MockCardIssuer, CardDetails
-from integration.card.stripe_card_issuer import StripeCardIssuer
+from integration.card.card_issuer import AsyncCardIssuer, CardDetails
+from workers.card_pool import card_pool
 
 router = APIRouter()
 
@@ -19,21 +17,21 @@ class CreateCardRequest(BaseModel):
     expiration_seconds: int = 3600  # Default expiration window of 1 hour
 
 
-def get_card_issuer() -> CardIssuer:
-    # For an MVP or testing, we use the mock adapter.
-    # In production, switch to the StripeCardIssuer.
-    if settings.ENV == "production":
-        return StripeCardIssuer(settings.STRIPE_API_KEY)
-    return MockCardIssuer()
+def get_card_issuer(request: Request) -> AsyncCardIssuer:
+    # Built once at startup (mock outside production, Stripe in production)
+    return request.app.state.card_issuer
 
 
 @router.post("/cards", response_model=CardDetails)
 async def create_card(
     request: CreateCardRequest,
-    card_issuer: CardIssuer = Depends(get_card_issuer)
+    card_issuer: AsyncCardIssuer = Depends(get_card_issuer)
 ):
     try:
-        card_response = card_issuer.create_card(
+        # Awaited end to end, so a slow issuer never blocks the event loop.
+        # Claims a pre-issued card when the pool is enabled and has one.
+        return await card_pool.checkout(
+            card_issuer,
             cardholder_id=request.cardholder_id,
             purchase_amount=request.purchase_amount,
             currency=request.currency,
@@ -42,8 +40,5 @@ async def create_card(
             blocked_categories=request.blocked_categories,
             expiration_seconds=request.expiration_seconds,
         )
-
-        card_details = card_issuer.get_card_details(card_response.id)
-        return card_details
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,172 +1,122 @@
-from pydantic import ValidationError
-from typing import List
+import asyncio
+import json
+from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-import openai
-from models import SessionLocal
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import get_db
 from models.profile import Profile
-from pydantic import BaseModel
+from bnpl.cache import profile_fingerprint
+from bnpl.features import bucket_price
+from bnpl.catalog import catalog_store
+from bnpl.ranking import rank_profile
+from bnpl.schemas import BNPLRanking, BNPLRankingsResponse
+from bnpl.streaming import stream_rankings
 from config import settings
 
 router = APIRouter()
 
 
-class BNPLRanking(BaseModel):
-    rank: int
-    provider: str
-    highlight: str
-    reasoning: str
+class BatchRankingItem(BaseModel):
+    user_id: int
+    product_price: float = Field(..., ge=0)
 
 
-class BNPLRankingsResponse(BaseModel):
-    rankings: List[BNPLRanking]
+class BatchRankingRequest(BaseModel):
+    items: List[BatchRankingItem] = Field(
+        ..., min_length=1, max_length=settings.BNPL_BATCH_MAX_ITEMS)
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+class BatchRankingResult(BaseModel):
+    user_id: int
+    product_price: float
+    rankings: Optional[BNPLRankingsResponse] = None
+    error: Optional[str] = None
 
 
-# Load OpenAI API Key
-openai.api_key = settings.OPENAI_API_KEY
+class BatchRankingResponse(BaseModel):
+    results: List[BatchRankingResult]
+
+
+@router.post("/rankings/batch", response_model=BatchRankingResponse)
+async def get_batch_rankings(request: BatchRankingRequest, db: AsyncSession = Depends(get_db)):
+    # Load every profile the batch needs in one query
+    user_ids = {item.user_id for item in request.items}
+    profiles = {
+        profile.user_id: profile
+        for profile in await db.scalars(select(Profile).where(Profile.user_id.in_(user_ids)))
+    }
+
+    # Users with identical ranking inputs asking about prices in the same band
+    # share one ranking
+    distinct = {}
+    for item in request.items:
+        profile = profiles.get(item.user_id)
+        if profile is not None:
+            distinct.setdefault((profile_fingerprint(profile), bucket_price(item.product_price)),
+                                (profile, item.product_price))
+
+    semaphore = asyncio.Semaphore(settings.BNPL_BATCH_CONCURRENCY)
+
+    async def rank(key):
+        async with semaphore:
+            try:
+                return await rank_profile(*distinct[key])
+            except HTTPException as e:
+                return e.detail
+            except Exception as e:
+                return str(e)
+
+    keys = list(distinct)
+    outcomes = dict(zip(keys, await asyncio.gather(*(rank(key) for key in keys))))
+
+    results = []
+    for item in request.items:
+        result = BatchRankingResult(user_id=item.user_id, product_price=item.product_price)
+        profile = profiles.get(item.user_id)
+        if profile is None:
+            result.error = "Profile not found"
+        else:
+            outcome = outcomes[(profile_fingerprint(profile), bucket_price(item.product_price))]
+            if isinstance(outcome, BNPLRankingsResponse):
+                result.rankings = outcome
+            else:
+                result.error = str(outcome)
+        results.append(result)
+    return BatchRankingResponse(results=results)
 
 
 @router.get("/{user_id}", response_model=BNPLRankingsResponse)
-def get_profile_with_ai_suggestion(user_id: int, product_price: float = Query(..., ge=0), db: Session = Depends(get_db)):
+async def get_profile_with_ai_suggestion(user_id: int, product_price: float = Query(..., ge=0), db: AsyncSession = Depends(get_db)):
     # Fetch profile from the database
-    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    profile = await db.scalar(select(Profile).where(Profile.user_id == user_id))
 
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
 
-    # Map profile data to the expected customer profile fields in the prompt
-    customer_profile = {
-        'name': profile.name,
-        'age': profile.dob,
-        'occupation': profile.job_title,
-        'monthly_income': profile.monthly_income,
-        'monthly_expenses': profile.monthly_expenses,
-        'product_price': product_price,
-    }
+    return await rank_profile(profile, product_price)
 
-    bnpl_providers = """
-    Klarna:
-    - Cashback Program: Cashback is earned on qualifying purchases and credited to the Klarna balance.
-    - Eligibility & Approval: Available only to customers residing in Ireland with a valid billing address.
-
-    Affirm:
-    - Eligibility: Users must be at least 18, reside in the UK, have a UK mobile number, and meet creditworthiness criteria.
-
-    Clearpay:
-    - Account & Eligibility: Available to UK residents aged 18+ with a valid UK mobile number and payment method.
-    """
-
-    prompt = f"""
-        You are an expert AI assistant who evaluates and ranks BNPL (Buy Now, Pay Later) providers based on user financial details, provider terms, and approval likelihood. In this task, you must consider key details from the terms and conditions of different providers, including Klarna’s Cashback Program, Affirm’s lending practices, and Clearpay’s installment plan structure.
-
-        ### User Details:
-        - Age: {customer_profile['age']}
-        - Occupation: {customer_profile['occupation']}
-        - Monthly Income: ${customer_profile['monthly_income']}
-        - Product Price: ${customer_profile['product_price']}
-
-        ### BNPL Providers:
-        {bnpl_providers}
-
-        ### Provider Terms Highlights:
-
-        **Klarna:**
-        - **Cashback Program:** Cashback is earned on qualifying purchases (excluding taxes and fees) and credited to the Klarna balance (rounded down to the nearest cent).
-        - **Eligibility & Approval:** Available only to customers residing in Ireland with a valid billing address; purchases require approval from participating stores.
-        - **Terms Flexibility:** Cashback rates and eligibility may change, with limited liability under Irish law.
-        - **Late Fees:** None mentioned explicitly.
-        - **Repayment Flexibility:** No early repayment penalties mentioned.
-
-        **Affirm:**
-        - **Eligibility & User Requirements:** Users must be at least 18, reside in the UK, have a UK mobile number, and meet strict creditworthiness and affordability criteria.
-        - **Service Model:** Affirm pays the merchant upfront while the user repays via a loan governed by a separate credit agreement.
-        - **Data & Decision Making:** Uses personal data for identity verification, performs automated credit checks, and reports payment behavior to credit agencies.
-        - **Liability & Updates:** Liability is limited, and terms can change with advance notice. Users are responsible for accurate account information and security.
-        - **APR:** Typically ranges from 10% to 30% based on creditworthiness.
-        - **Repayment Flexibility:** Potential for extension based on agreement terms.
-
-        **Clearpay:**
-        - **Account & Eligibility:** Available to UK residents (excluding Channel Islands), aged 18+ with a valid UK billing address, UK mobile number, and payment method.
-        - **Plan Structure:** Provides a fixed 4-installment, interest-free plan with payments automatically deducted every two weeks after pre-authorization checks.
-        - **Late Fees & Penalties:** Charges a £6 late fee for missed installments (with orders of £24 or more possibly incurring two fees capped at the lower of £24 or 25% of the purchase price).
-        - **Refunds & Cancellations:** Adjusts payment schedules for refunds; orders may be canceled before delivery if issues arise.
-        - **Security & Account Management:** Emphasizes secure account management, with measures to suspend or close accounts for suspicious activities.
-        - **Late Fee Structure:** £6 for missed payments.
-
-        #### Evaluation Criteria:
-        1. **Approval Likelihood:** Can the user get approved based on their income, product price, and each provider's limits?
-        2. **Interest Rate & Loan/Plan Terms:** Lower interest rates or favorable installment terms are preferred.
-        3. **Repayment Options Match:** Does the provider offer the user’s preferred repayment method?
-        4. **Financing Capacity:** Can the provider finance the purchase based on transaction and credit limits?
-        5. **Clarity & Favorability of Terms:** Consider how clearly and favorably each provider presents its eligibility requirements, fees, and additional benefits (such as Klarna’s cashback, Affirm’s structured loan process, or Clearpay’s interest-free installment plan).
-
-        #### Instructions:
-        Rank the BNPL providers **from best to worst** using the evaluation criteria above. 
-
-        Provide a ranked evaluation of BNPL (Buy Now, Pay Later) providers in the following strict JSON format:""" + """```json
-        {
-        "rankings": [
-            {
-            "rank": 1,
-            "provider": "Provider A",
-            "highlight": "0% Interest Rate!",
-            "reasoning": "..."
-            },
-            {
-            "rank": 2,
-            "provider": "Provider B",
-            "highlight": "High Approval Rate",
-            "reasoning": "..."
-            },
-            {
-            "rank": 3,
-            "provider": "Provider C",
-            "highlight": "Trusted by 90% of customers",
-            "reasoning": "..."
-            }
-        ]
-        }
-        ```
-
-        **Requirements:**
-        1. Each ranking must include:
-        - `"rank"`: An integer indicating the position (e.g., 1, 2, 3).
-        - `"provider"`: The name of the BNPL provider.
-        - `"highlight"`: A short, impactful highlight (e.g., "0% Interest Rate!", "High Approval Rate", "Trusted by 90% of customers").
-        - `"reasoning"`: A summarized reasoning based on the evaluation criteria.
-        
-        2. The `"highlight"` field should include metrics or quantitative impact wherever possible.
-
-        3. Please respond with the JSON as plain text, without any formatting, code blocks, or additional commentary.
-    """
-
-    # Call OpenAI API
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "system", "content": "You are a financial advisor that evaluates BNPL (Buy Now, Pay Later) options for users."},
-                      {"role": "user", "content": prompt}],
-            temperature=0.7
-        )
-        ai_suggestion = response["choices"][0]["message"]["content"]
-
-        # Parse the LLM response into the Pydantic model
-        try:
-            bnpl_rankings = BNPLRankingsResponse.model_validate_json(
-                ai_suggestion)
-        except ValidationError as ve:
-            raise HTTPException(
-                status_code=500, detail=f"Validation Error: {ve}")
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OpenAI Error: {str(e)}")
+@router.get("/{user_id}/stream")
+async def stream_profile_ai_suggestion(user_id: int, product_price: float = Query(..., ge=0), db: AsyncSession = Depends(get_db)):
+    profile = await db.scalar(select(Profile).where(Profile.user_id == user_id))
 
-    return bnpl_rankings
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    catalog = catalog_store.current
+
+    async def events():
+        # One "ranking" event per BNPLRanking, then "done" (or "error")
+        try:
+            async for ranking in stream_rankings(profile, product_price, catalog):
+                yield f"event: ranking\ndata: {ranking.model_dump_json()}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+            return
+        yield f"event: done\ndata: {json.dumps({'catalog_version': catalog.version})}\n\n"
+
+    return StreamingResponse(
+        events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
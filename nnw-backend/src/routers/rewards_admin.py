@@ -0,0 +1,61 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import get_db
+from models.reward import Reward
+from rewards.catalog import rewards_catalog
+
+router = APIRouter()
+
+
+class RewardCreate(BaseModel):
+    name: str
+    category: str
+    reward_amount: float = Field(..., gt=0)
+    needed_points: int = Field(..., gt=0)
+
+
+class RewardUpdate(BaseModel):
+    name: Optional[str] = None
+    category: Optional[str] = None
+    reward_amount: Optional[float] = Field(None, gt=0)
+    needed_points: Optional[int] = Field(None, gt=0)
+    active: Optional[bool] = None
+
+
+class RewardResponse(RewardCreate):
+    id: int
+    active: bool
+
+    model_config = {"from_attributes": True}
+
+
+async def _save(db: AsyncSession, reward: Reward) -> Reward:
+    try:
+        await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="A reward with this name already exists")
+    # Visible here immediately; other workers pick it up on their next refresh
+    await rewards_catalog.refresh()
+    return reward
+
+
+@router.post("", response_model=RewardResponse, status_code=201)
+async def create_reward(body: RewardCreate, db: AsyncSession = Depends(get_db)):
+    reward = Reward(**body.model_dump())
+    db.add(reward)
+    return await _save(db, reward)
+
+
+@router.put("/{reward_id}", response_model=RewardResponse)
+async def update_reward(reward_id: int, body: RewardUpdate, db: AsyncSession = Depends(get_db)):
+    reward = await db.get(Reward, reward_id)
+    if reward is None:
+        raise HTTPException(status_code=404, detail="Reward not found")
+    for field, value in body.model_dump(exclude_unset=True).items():
+        setattr(reward, field, value)
+    return await _save(db, reward)
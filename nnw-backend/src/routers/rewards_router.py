@@ -1,81 +1,131 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.redeemed_rewards import RedeemedRewards
-from models.user_points import UserPoints
-from models import SessionLocal
+from models import get_db
+from points.balance_cache import balance_cache
+from routers.user_points_router import load_balance
+from rewards.catalog import rewards_catalog
+from rewards.redemption import InsufficientPoints, redeem
+from rewards.schemas import AffordableRewardsResponse
+from config import settings
 from pydantic import BaseModel
-from datetime import datetime
 
 
 class RedeemRewardRequest(BaseModel):
-    reward_name: str
-    # The actual gift card amount (the value of the reward)
-    reward_amount: float
-    needed_points: int
+    # Name, value and price all come from the server-side catalog
+    reward_id: int
 
 
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@router.get("/catalog", response_model=AffordableRewardsResponse)
+async def get_catalog(points: Optional[float] = Query(None, ge=0), category: Optional[str] = None):
+    # Served entirely from memory; with ``points`` only what that many points can buy
+    return AffordableRewardsResponse(
+        points=points, category=category, rewards=rewards_catalog.affordable(points, category))
 
 
-@router.get("/{user_id}/redeemed-rewards")
-def get_redeemed_rewards(user_id: int, db: Session = Depends(get_db)):
-    redeemed_rewards = db.query(RedeemedRewards).filter(
-        RedeemedRewards.user_id == user_id).all()
-    if not redeemed_rewards:
-        raise HTTPException(
-            status_code=404, detail="No redeemed rewards found for this user")
+@router.get("/catalog/categories")
+async def get_catalog_categories():
+    return {"categories": rewards_catalog.categories()}
 
-    return [
-        {
-            "reward_name": reward.reward_name,
-            "reward_amount": reward.reward_amount,
-            "redeemed_at": reward.redeemed_at.strftime("%Y-%m-%d %H:%M:%S")
-        }
-        for reward in redeemed_rewards
-    ]
 
+@router.get("/{user_id}/affordable", response_model=AffordableRewardsResponse)
+async def get_affordable_rewards(user_id: int, category: Optional[str] = None):
+    points = await balance_cache.get(user_id, load_balance)
+    if points is None:
+        raise HTTPException(status_code=404, detail="User points not found")
+    return AffordableRewardsResponse(
+        points=points, category=category, rewards=rewards_catalog.affordable(points, category))
 
-@router.post("/{user_id}/redeemed-rewards")
-def redeem_reward(user_id: int, request: RedeemRewardRequest, db: Session = Depends(get_db)):
-    reward_name = request.reward_name
-    reward_amount = request.reward_amount
-    needed_points = request.needed_points
 
-    # Check if the user has enough points
-    user_points = db.query(UserPoints).filter(
-        UserPoints.user_id == user_id).first()
+def encode_cursor(redeemed_at: datetime, reward_id: int) -> str:
+    raw = f"{redeemed_at.isoformat()}|{reward_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
-    if not user_points or user_points.points < needed_points:
-        raise HTTPException(
-            status_code=400, detail="Not enough points to redeem this reward")
 
-    # Set the redeemed_at field to the current time
-    redeemed_at = datetime.now()
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        redeemed_at, reward_id = raw.split("|")
+        return datetime.fromisoformat(redeemed_at), int(reward_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    # Create a new redeemed reward record
-    new_reward = RedeemedRewards(
-        user_id=user_id,
-        reward_name=reward_name,
-        reward_amount=reward_amount,
-        needed_points=needed_points,
-        redeemed_at=redeemed_at
-    )
 
-    # Add the new reward to the database
-    db.add(new_reward)
+@router.get("/{user_id}/redeemed-rewards")
+async def get_redeemed_rewards(
+    user_id: int,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.REWARDS_HISTORY_PAGE_SIZE, ge=1, le=settings.REWARDS_HISTORY_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_db),
+):
+    # Newest first, keyset-paginated on (redeemed_at, id) so every page is an
+    # index range scan no matter how deep the client pages.
+    query = (
+        select(RedeemedRewards.id, RedeemedRewards.reward_name,
+               RedeemedRewards.reward_amount, RedeemedRewards.redeemed_at)
+        .where(RedeemedRewards.user_id == user_id)
+        .order_by(RedeemedRewards.redeemed_at.desc(), RedeemedRewards.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        redeemed_at, reward_id = decode_cursor(cursor)
+        query = query.where(or_(
+            RedeemedRewards.redeemed_at < redeemed_at,
+            and_(RedeemedRewards.redeemed_at == redeemed_at, RedeemedRewards.id < reward_id),
+        ))
+
+    rows = (await db.execute(query)).all()
+    if not rows and not cursor:
+        raise HTTPException(
+            status_code=404, detail="No redeemed rewards found for this user")
 
-    # Deduct the points
-    user_points.points -= needed_points
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1].redeemed_at, page[-1].id) if len(rows) > limit else None
+    return {
+        "items": [
+            {
+                "reward_name": reward.reward_name,
+                "reward_amount": reward.reward_amount,
+                "redeemed_at": reward.redeemed_at.strftime("%Y-%m-%d %H:%M:%S")
+            }
+            for reward in page
+        ],
+        "next_cursor": next_cursor,
+    }
 
-    # Commit the changes to the database
-    db.commit()
 
-    return {"message": f"Reward '{reward_name}' redeemed successfully", "user_id": user_id, "reward_name": reward_name}
+@router.post("/{user_id}/redeemed-rewards")
+async def redeem_reward(
+    user_id: int,
+    request: RedeemRewardRequest,
+    idempotency_key: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_db),
+):
+    catalog_reward = rewards_catalog.get(request.reward_id)
+    if catalog_reward is None:
+        raise HTTPException(status_code=404, detail="Reward not found")
+
+    # Debit the points and record the reward atomically; a retry carrying the
+    # same Idempotency-Key gets the original redemption back.
+    try:
+        reward, replayed = await redeem(db, user_id, catalog_reward, idempotency_key)
+    except InsufficientPoints:
+        raise HTTPException(
+            status_code=400, detail="Not enough points to redeem this reward")
+    if not replayed:
+        await balance_cache.invalidate(user_id)
+
+    return {
+        "message": f"Reward '{reward.reward_name}' redeemed successfully",
+        "user_id": user_id,
+        "reward_name": reward.reward_name,
+        "redemption_id": reward.id,
+        "replayed": replayed,
+    }
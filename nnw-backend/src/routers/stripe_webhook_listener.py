@@ -1,16 +1,20 @@
 import stripe
-from fastapi import APIRouter, Request, HTTPException
+from fastapi import APIRouter, Depends, Request, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
+from models import get_db
+from models.webhook_event import WebhookEvent
+from workers.webhook_dedupe import webhook_dedupe
+from workers.webhook_events import webhook_event_worker
 
 router = APIRouter()
 
-stripe.api_key = settings.STRIPE_API_KEY
 # Your webhook secret from Stripe
 endpoint_secret = settings.STRIPE_WEBHOOK_SECRET
 
 
 @router.post("/webhooks/stripe")
-async def stripe_webhook(request: Request):
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_db)):
     payload = await request.body()
     sig_header = request.headers.get("Stripe-Signature")
 
@@ -23,17 +27,22 @@ async def stripe_webhook(request: Request):
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    # Process the event. For a one-time card, we assume an authorization event indicates usage.
-    if event["type"] == "issuing.authorization.created":
-        auth = event["data"]["object"]
-        # Extract the card id from the authorization object.
-        card_id = auth.get("card", {}).get("id")
-        if card_id:
-            try:
-                # Cancel the card to prevent further use.
-                stripe.issuing.Card.update(card_id, status="canceled")
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=str(e))
+    # Queue the event and ack; workers/webhook_events.py does the handling
+    # (e.g. cancelling a one-time card once it is used). If the insert fails
+    # the error response makes Stripe redeliver.
+    # A redelivery of an event this process recently handled is acked as
+    # is; the worker catches the rest against the processed-events table.
+    if webhook_dedupe.seen_recently(event["id"]):
+        return {"status": "success"}
+    handled = webhook_event_worker.handles(event["type"])
+    if handled:
+        db.add(WebhookEvent(
+            event_id=event["id"],
+            event_type=event["type"],
+            payload=payload.decode("utf-8"),
+        ))
+        await db.commit()
+    webhook_event_worker.record_received(handled)
 
     # Acknowledge receipt of the event.
     return {"status": "success"}
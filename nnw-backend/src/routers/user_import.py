@@ -0,0 +1,75 @@
+import asyncio
+import os
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models import get_db
+from models.user_import_job import UserImportJob
+from workers.user_import import ImportJobBusy, claim_job, create_job, detect_format, run_import
+
+router = APIRouter()
+
+# Strong references so running imports are not garbage collected
+_running = set()
+
+
+class ImportJobResponse(BaseModel):
+    id: int
+    status: str
+    format: str
+    rows_processed: int
+    imported: int
+    rejected: int
+    rejects_path: str
+    error: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+def _start(job_id: int) -> None:
+    task = asyncio.create_task(run_import(job_id))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+@router.post("", response_model=ImportJobResponse, status_code=202)
+async def start_import(file: UploadFile = File(...)):
+    # Spool the upload to disk in chunks; the job streams it back from there.
+    os.makedirs(settings.USER_IMPORT_DIR, exist_ok=True)
+    fmt = detect_format(file.filename or "")
+    path = os.path.join(settings.USER_IMPORT_DIR, f"{uuid.uuid4().hex}.{fmt}")
+    with open(path, "wb") as out:
+        while chunk := await file.read(1024 * 1024):
+            out.write(chunk)
+
+    job = await create_job(path, fmt)
+    job = await claim_job(job.id)
+    _start(job.id)
+    return job
+
+
+@router.get("/{job_id}", response_model=ImportJobResponse)
+async def get_import(job_id: int, db: AsyncSession = Depends(get_db)):
+    job = await db.get(UserImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.post("/{job_id}/resume", response_model=ImportJobResponse, status_code=202)
+async def resume_import(job_id: int):
+    # A running job is only resumed once its lease has lapsed, i.e. the
+    # process running it died
+    try:
+        job = await claim_job(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    except ImportJobBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    _start(job.id)
+    return job
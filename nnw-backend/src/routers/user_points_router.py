@@ -1,44 +1,45 @@
 # user_points_router.py
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from models.user_points import UserPoints
-from models import SessionLocal
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models import AsyncSessionLocal, get_db
+from points.balance_cache import balance_cache
+from points.crediting import credit_points, points_write_behind
+from points.ledger import get_balance
 from pydantic import BaseModel
 router = APIRouter()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 class AddPointsRequest(BaseModel):
     points_to_add: float
 
 
+async def load_balance(user_id: int):
+    async with AsyncSessionLocal() as db:
+        return await get_balance(db, user_id)
+
+
 @router.get("/{user_id}/points")
-def get_user_points(user_id: int, db: Session = Depends(get_db)):
+async def get_user_points(user_id: int):
+    # No session dependency: cache hits never touch the connection pool
     if user_id:
-        user_points = db.query(UserPoints).filter(
-            UserPoints.user_id == user_id).first()
-        print(user_points)
-        if not user_points:
+        points = await balance_cache.get(user_id, load_balance)
+        if points is None:
             raise HTTPException(
                 status_code=404, detail="User points not found")
-        return {"user_id": user_points.user_id, "points": user_points.points}
+        return {"user_id": user_id, "points": points}
 
 
 @router.post("/{user_id}/add-points")
-def add_points(user_id: int, request: AddPointsRequest, db: Session = Depends(get_db)):
+async def add_points(user_id: int, request: AddPointsRequest, db: AsyncSession = Depends(get_db)):
     points_to_add = request.points_to_add
-    user_points = db.query(UserPoints).filter(
-        UserPoints.user_id == user_id).first()
-    if not user_points:
-        user_points = UserPoints(user_id=user_id, points=0)
-        db.add(user_points)
-    user_points.points += points_to_add
-    db.commit()
-    return {"message": f"{points_to_add} points added to user {user_id}", "user_id": user_id, "new_points": user_points.points}
+    try:
+        if points_write_behind.running:
+            new_points = await points_write_behind.credit(user_id, points_to_add)
+        else:
+            new_points = await credit_points(db, user_id, points_to_add)
+            await db.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=404, detail="User not found")
+    await balance_cache.invalidate(user_id)
+    return {"message": f"{points_to_add} points added to user {user_id}", "user_id": user_id, "new_points": new_points}
@@ -0,0 +1,186 @@
+"""
+Password hashing on a dedicated, bounded process pool.
+
+bcrypt is deliberately slow and holds the GIL, so running it inline stalls
+every other request on the worker. Hashes and verifications are shipped to a
+small process pool instead; when too many are already queued, new ones are
+rejected with ``PasswordHashingSaturated`` rather than queueing unboundedly.
+Bulk imports hash on a separate pool (``PASSWORD_IMPORT_WORKERS`` processes,
+spawned on first use), so sign-ups and logins never queue behind an import;
+keep the two pools together within the machine's cores.
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from passlib.context import CryptContext
+
+import metrics
+from config import settings
+
+_contexts = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    # Any hash not at the configured cost is flagged for update on verify.
+    if rounds not in _contexts:
+        _contexts[rounds] = CryptContext(
+            schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+    return _contexts[rounds]
+
+
+def _warm_up(rounds: int) -> None:
+    _context(rounds)
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _hash_batch(passwords: List[str], rounds: int) -> List[str]:
+    context = _context(rounds)
+    return [context.hash(password) for password in passwords]
+
+
+def _verify_and_update(password: str, hashed_password: str, rounds: int) -> Tuple[bool, Optional[str]]:
+    return _context(rounds).verify_and_update(password, hashed_password)
+
+
+class PasswordHashingSaturated(Exception):
+    pass
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn keeps the children independent of the parent's event loop and
+    # threads.
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int, rounds: int,
+                 import_workers: int = 1, import_chunk_size: int = 16):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.import_workers = import_workers
+        self.import_chunk_size = import_chunk_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._import_executor: Optional[ProcessPoolExecutor] = None
+        self.pending = 0
+        self.rejected = 0
+        self.rehashes = 0
+        self.imported = 0
+        self.hash_latency = metrics.LatencyRecorder()
+        self.verify_latency = metrics.LatencyRecorder()
+        # Per hash_many call and per chunk, kept apart from interactive latency
+        self.import_batch_latency = metrics.LatencyRecorder()
+        self.import_chunk_latency = metrics.LatencyRecorder()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = _process_pool(self.workers)
+        return self._executor
+
+    @property
+    def import_executor(self) -> ProcessPoolExecutor:
+        if self._import_executor is None:
+            self._import_executor = _process_pool(self.import_workers)
+        return self._import_executor
+
+    async def _run(self, recorder: metrics.LatencyRecorder, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHashingSaturated(
+                f"{self.pending} password operations already queued")
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.pending -= 1
+            recorder.observe(time.perf_counter() - start)
+
+    async def start(self) -> None:
+        # Pay the process spawn and import cost at startup, not on the first sign-up
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(
+            loop.run_in_executor(self.executor, _warm_up, self.rounds)
+            for _ in range(self.workers)
+        ))
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.hash_latency, _hash, password, self.rounds)
+
+    async def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hash a bulk batch on the import pool in small chunks, so a chunk is
+        never much more work than a handful of interactive hashes. The
+        import pool is separate from the interactive one, so bulk work is
+        not subject to ``max_pending`` and cannot delay sign-ups or logins.
+        """
+        if not passwords:
+            return []
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+
+        async def hash_chunk(chunk: List[str]) -> List[str]:
+            chunk_start = time.perf_counter()
+            hashed = await loop.run_in_executor(self.import_executor, _hash_batch, chunk, self.rounds)
+            self.import_chunk_latency.observe(time.perf_counter() - chunk_start)
+            return hashed
+
+        size = self.import_chunk_size
+        chunks = await asyncio.gather(*(
+            hash_chunk(passwords[i:i + size]) for i in range(0, len(passwords), size)))
+        self.imported += len(passwords)
+        self.import_batch_latency.observe(time.perf_counter() - start)
+        return [hashed for chunk in chunks for hashed in chunk]
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password against its hash.
+
+        Returns ``(verified, new_hash)``; ``new_hash`` is set when the stored
+        hash was produced with a different bcrypt cost and should replace it.
+        """
+        verified, new_hash = await self._run(
+            self.verify_latency, _verify_and_update, password, hashed_password, self.rounds)
+        if new_hash:
+            self.rehashes += 1
+        return verified, new_hash
+
+    def shutdown(self) -> None:
+        for executor in (self._executor, self._import_executor):
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        self._executor = None
+        self._import_executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "rounds": self.rounds,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "rehashes": self.rehashes,
+            "hash": self.hash_latency.as_dict(),
+            "verify": self.verify_latency.as_dict(),
+            "import_workers": self.import_workers,
+            "imported": self.imported,
+            "import_batch": self.import_batch_latency.as_dict(),
+            "import_chunk": self.import_chunk_latency.as_dict(),
+        }
+
+
+password_hasher = PasswordHasher(
+    settings.PASSWORD_HASH_WORKERS,
+    settings.PASSWORD_HASH_MAX_PENDING,
+    settings.BCRYPT_ROUNDS,
+    settings.PASSWORD_IMPORT_WORKERS,
+    settings.PASSWORD_IMPORT_CHUNK_SIZE,
+)
+metrics.register("password_hashing", password_hasher.stats)
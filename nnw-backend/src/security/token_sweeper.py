@@ -0,0 +1,112 @@
+"""
+Background removal of expired refresh tokens.
+
+The default layout deletes expired rows in bounded batches through the
+``expires`` index, committing between batches so no long-running lock or
+transaction builds up. With ``REFRESH_TOKENS_PARTITIONED`` on Postgres the
+table is range-partitioned by day instead: the sweeper keeps partitions
+created ahead of the longest refresh-token lifetime and drops whole
+partitions once everything in them has expired.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, text
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal, engine
+from models.refresh_token import PARTITIONED, RefreshToken
+from models.revoked_session import RevokedSession
+from security.tokens import REFRESH_TOKEN_EXPIRE_DAYS
+from workers.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "refresh_tokens_p"
+
+
+class RefreshTokenSweeper:
+    def __init__(self):
+        self.runs = 0
+        self.rows_removed = 0
+        self.partitions_dropped = 0
+        self.duration = metrics.LatencyRecorder()
+
+    @property
+    def partitioned(self) -> bool:
+        return PARTITIONED and engine.dialect.name == "postgresql"
+
+    async def sweep(self) -> None:
+        start = time.perf_counter()
+        if self.partitioned:
+            await self._maintain_partitions()
+        else:
+            self.rows_removed += await self._delete_expired(RefreshToken)
+        self.rows_removed += await self._delete_expired(RevokedSession)
+        self.runs += 1
+        self.duration.observe(time.perf_counter() - start)
+
+    async def _delete_expired(self, model) -> int:
+        removed = 0
+        now = datetime.utcnow()
+        for _ in range(settings.TOKEN_SWEEP_MAX_BATCHES):
+            async with AsyncSessionLocal() as db:
+                expired_ids = (
+                    select(model.id)
+                    .where(model.expires < now)
+                    .limit(settings.TOKEN_SWEEP_BATCH_SIZE)
+                    .scalar_subquery()
+                )
+                result = await db.execute(delete(model).where(model.id.in_(expired_ids)))
+                await db.commit()
+            removed += result.rowcount
+            if result.rowcount < settings.TOKEN_SWEEP_BATCH_SIZE:
+                break
+        return removed
+
+    async def _maintain_partitions(self) -> None:
+        # Partition bounds are UTC days, like the expires values they hold
+        today = datetime.utcnow().date()
+        async with engine.begin() as conn:
+            # Cover yesterday through the expiry of a token issued tomorrow
+            for offset in range(-1, REFRESH_TOKEN_EXPIRE_DAYS + 2):
+                day = today + timedelta(days=offset)
+                await conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {PARTITION_PREFIX}{day:%Y%m%d} "
+                    f"PARTITION OF refresh_tokens "
+                    f"FOR VALUES FROM ('{day.isoformat()}') TO ('{(day + timedelta(days=1)).isoformat()}')"
+                ))
+
+            partitions = (await conn.execute(text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "WHERE parent.relname = 'refresh_tokens'"
+            ))).scalars().all()
+            for name in partitions:
+                try:
+                    day = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()
+                except ValueError:
+                    continue
+                # Every token in the partition expired before today began
+                if day + timedelta(days=1) <= today:
+                    await conn.execute(text(f"DROP TABLE {name}"))
+                    self.partitions_dropped += 1
+                    logger.info("Dropped expired refresh token partition %s", name)
+
+    def stats(self) -> dict:
+        return {
+            "layout": "partitioned" if self.partitioned else "batched_delete",
+            "runs": self.runs,
+            "rows_removed": self.rows_removed,
+            "partitions_dropped": self.partitions_dropped,
+            "duration": self.duration.as_dict(),
+        }
+
+
+token_sweeper = RefreshTokenSweeper()
+token_sweeper_task = PeriodicTask(
+    "refresh-token-sweeper", settings.TOKEN_SWEEP_INTERVAL_SECONDS, token_sweeper.sweep)
+metrics.register("refresh_token_sweeper", token_sweeper.stats)
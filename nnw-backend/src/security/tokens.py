@@ -0,0 +1,221 @@
+"""
+JWT issuing and stateless verification.
+
+Access tokens are checked by signature and expiry only; decoded claims are
+memoized until the token expires, so repeat requests skip even the HMAC.
+Revocation is checked against an in-memory set of revoked session ids that
+is synced incrementally from the ``revoked_sessions`` table, so the common
+request path makes no database queries for auth.
+"""
+import hashlib
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+import jwt
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy import delete, insert, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from models.refresh_token import RefreshToken
+from models.revoked_session import RevokedSession
+from workers.periodic import PeriodicTask
+
+# Configuration
+JWT_SECRET = settings.JWT_SECRET
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 15
+REFRESH_TOKEN_EXPIRE_DAYS = 7
+
+
+def hash_jti(jti: str) -> str:
+    return hashlib.sha256(jti.encode()).hexdigest()
+
+
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire, "type": "access"})
+    return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def create_refresh_token(user_id: int, sid: str) -> Tuple[str, str, datetime]:
+    jti = str(uuid.uuid4())
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    payload = {"user_id": user_id, "sid": sid, "jti": jti, "exp": expire, "type": "refresh"}
+    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return token, jti, expire
+
+
+async def rotate_refresh_token(db: AsyncSession, user_id: int, sid: str, jti: str) -> Optional[str]:
+    """
+    Replace the live refresh-token record for ``jti`` with a new one and
+    return the new token, or None when no unexpired record matched.
+
+    On Postgres the delete and insert run as a single statement (a
+    data-modifying CTE), so a concurrent replay of the same token can never
+    rotate it twice. Other dialects fall back to DELETE ... RETURNING plus an
+    INSERT in the caller's transaction.
+    """
+    token, new_jti, expires = create_refresh_token(user_id, sid)
+    consumed = delete(RefreshToken).where(
+        RefreshToken.jti_hash == hash_jti(jti),
+        RefreshToken.user_id == user_id,
+        RefreshToken.expires >= datetime.utcnow(),
+    ).returning(RefreshToken.user_id)
+
+    if db.bind.dialect.name == "postgresql":
+        consumed = consumed.cte("consumed")
+        result = await db.execute(insert(RefreshToken).from_select(
+            ["jti_hash", "user_id", "expires"],
+            select(literal(hash_jti(new_jti)), consumed.c.user_id, literal(expires)),
+        ))
+        return token if result.rowcount else None
+
+    if (await db.execute(consumed)).first() is None:
+        return None
+    await db.execute(insert(RefreshToken).values(
+        jti_hash=hash_jti(new_jti), user_id=user_id, expires=expires))
+    return token
+
+
+class TokenClaimsCache:
+    """Bounded LRU of decoded access-token claims, each kept until its ``exp``."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        claims = self._entries.get(token)
+        if claims is not None and claims["exp"] <= time.time():
+            del self._entries[token]
+            claims = None
+        if claims is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(token)
+        return claims
+
+    def put(self, token: str, claims: dict) -> None:
+        self._entries[token] = claims
+        if len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class RevocationList:
+    """
+    In-memory view of ``revoked_sessions``.
+
+    Each sync re-reads rows created since the newest ``created_at`` already
+    seen minus ``TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS``. ``created_at`` (like
+    the id) is assigned before commit, so a revocation committing after newer
+    ones have been synced still falls inside the overlap; rows are keyed by
+    sid hash, so re-reading them is harmless. Every
+    ``TOKEN_REVOCATION_FULL_SYNC_SECONDS`` all unexpired rows are reloaded,
+    which also covers a transaction slower than the overlap.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._watermark: Optional[datetime] = None
+        self._last_full_sync = 0.0
+        self.syncs = 0
+        self.full_syncs = 0
+
+    def is_revoked(self, sid: str) -> bool:
+        return hash_jti(sid) in self._revoked
+
+    def add(self, sid_hash: str, expires: datetime) -> None:
+        self._revoked[sid_hash] = _timestamp(expires)
+
+    async def sync(self) -> None:
+        full = (self._watermark is None or time.monotonic() - self._last_full_sync
+                >= settings.TOKEN_REVOCATION_FULL_SYNC_SECONDS)
+        query = (
+            select(RevokedSession.sid_hash, RevokedSession.expires, RevokedSession.created_at)
+            .where(RevokedSession.expires > datetime.utcnow())
+        )
+        if not full:
+            overlap = timedelta(seconds=settings.TOKEN_REVOCATION_SYNC_OVERLAP_SECONDS)
+            query = query.where(RevokedSession.created_at >= self._watermark - overlap)
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(query)).all()
+        for sid_hash, expires, created_at in rows:
+            self.add(sid_hash, expires)
+            if self._watermark is None or created_at > self._watermark:
+                self._watermark = created_at
+        if self._watermark is None:
+            # Nothing revoked yet; later rows are all newer than this
+            self._watermark = datetime.utcnow()
+        if full:
+            self._last_full_sync = time.monotonic()
+            self.full_syncs += 1
+        # Once expired, a session's access tokens are rejected by exp anyway
+        now = time.time()
+        for sid_hash in [h for h, expires in self._revoked.items() if expires <= now]:
+            del self._revoked[sid_hash]
+        self.syncs += 1
+
+    def stats(self) -> dict:
+        return {"revoked_sessions": len(self._revoked), "syncs": self.syncs, "full_syncs": self.full_syncs}
+
+
+def _timestamp(value: datetime) -> float:
+    # Naive datetimes in this codebase are UTC
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+claims_cache = TokenClaimsCache(settings.TOKEN_CLAIMS_CACHE_SIZE)
+revocation_list = RevocationList()
+revocation_sync_task = PeriodicTask(
+    "token-revocation-sync", settings.TOKEN_REVOCATION_SYNC_SECONDS, revocation_list.sync)
+metrics.register("auth_tokens", lambda: dict(
+    claims_cache=claims_cache.stats(), **revocation_list.stats()))
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    if payload.get("type") != token_type or not payload.get("user_id") or not payload.get("sid"):
+        raise HTTPException(status_code=401, detail="Invalid token payload")
+    return payload
+
+
+def verify_access_token(token: str) -> dict:
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = decode_token(token, "access")
+        claims_cache.put(token, claims)
+    if revocation_list.is_revoked(claims["sid"]):
+        raise HTTPException(status_code=401, detail="Session revoked")
+    return claims
+
+
+bearer_scheme = HTTPBearer()
+
+
+def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)) -> int:
+    return verify_access_token(credentials.credentials)["user_id"]
@@ -0,0 +1,292 @@
+"""
+Pool of pre-issued, inactive virtual cards per active cardholder.
+
+Creating a card at checkout costs several sequential issuer round trips. With
+``CARD_POOL_SIZE`` > 0 a checkout instead claims one of the cardholder's
+pooled cards and activates it with the purchase's spending controls and
+metadata, falling back to creating a card on demand when the pool is empty
+or the activation fails. A card whose activation failed may already be live,
+so it is cancelled before the fallback; if that cancel fails too, the
+checkout errors out instead of risking a second live card and the card is
+left ``discard`` for the replenisher to cancel. The replenisher tops every
+active cardholder (one with a checkout in the last
+``CARD_POOL_ACTIVE_SECONDS``) back up to the pool size, and cancels the
+pooled cards of cardholders who are no longer active. A claim is a single conditional UPDATE, so two checkouts (or two
+instances) can never hand out the same card; concurrent replenishers on
+several instances can briefly overfill a pool, which later runs absorb.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select, update
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from models.card_pool import CardPoolEntry
+from integration.card.card_issuer import AsyncCardIssuer, CardDetails
+from workers.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+class CardPool:
+    def __init__(self):
+        # Set at startup to the app's shared issuer
+        self.issuer: Optional[AsyncCardIssuer] = None
+        self.hits = 0
+        self.misses = 0
+        self.activation_failures = 0
+        self.cards_retired = 0
+        self.cancel_failures = 0
+        self.cards_issued = 0
+        self.issue_failures = 0
+        self.rows_pruned = 0
+        self.available = 0
+        self.active_cardholders = 0
+        self.hit_latency = metrics.LatencyRecorder()
+        self.replenish_duration = metrics.LatencyRecorder()
+
+    @property
+    def enabled(self) -> bool:
+        return settings.CARD_POOL_SIZE > 0
+
+    async def checkout(
+        self,
+        issuer: AsyncCardIssuer,
+        cardholder_id: str,
+        purchase_amount: int,
+        currency: str,
+        merchant_id: str,
+        allowed_categories: Optional[List[str]] = None,
+        blocked_categories: Optional[List[str]] = None,
+        expiration_seconds: int = 3600
+    ) -> CardDetails:
+        """Card for a purchase, from the pool when one is ready."""
+        if self.enabled and currency == settings.CARD_POOL_CURRENCY:
+            start = time.perf_counter()
+            card_id = await self.claim(cardholder_id, currency)
+            if card_id is None:
+                self.misses += 1
+                await self._record_miss(cardholder_id, currency)
+            else:
+                try:
+                    details = await issuer.activate_card_with_details(
+                        card_id, cardholder_id, purchase_amount, merchant_id,
+                        allowed_categories, blocked_categories, expiration_seconds)
+                except Exception:
+                    self.activation_failures += 1
+                    logger.exception("Activating pooled card %s failed", card_id)
+                    # The update may have gone through before a later call
+                    # failed, so the card could be live with this purchase's
+                    # controls; only fall back once it is cancelled
+                    await self._cancel_claimed(issuer, card_id)
+                    logger.info("Cancelled pooled card %s; creating one instead", card_id)
+                else:
+                    self.hits += 1
+                    self.hit_latency.observe(time.perf_counter() - start)
+                    return details
+
+        return await issuer.create_card_with_details(
+            cardholder_id, purchase_amount, currency, merchant_id,
+            allowed_categories, blocked_categories, expiration_seconds)
+
+    async def claim(self, cardholder_id: str, currency: str) -> Optional[str]:
+        """Take the cardholder's oldest pooled card; None when the pool is empty."""
+        async with AsyncSessionLocal() as db:
+            oldest = (
+                select(CardPoolEntry.id)
+                .where(CardPoolEntry.cardholder_id == cardholder_id,
+                       CardPoolEntry.currency == currency,
+                       CardPoolEntry.status == "available")
+                .order_by(CardPoolEntry.id)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+            card_id = await db.scalar(
+                update(CardPoolEntry)
+                .where(CardPoolEntry.id == oldest, CardPoolEntry.status == "available")
+                .values(status="claimed", claimed_at=datetime.utcnow())
+                .returning(CardPoolEntry.card_id)
+            )
+            await db.commit()
+        if card_id is not None:
+            self.available = max(self.available - 1, 0)
+        return card_id
+
+    async def _cancel_claimed(self, issuer: AsyncCardIssuer, card_id: str) -> None:
+        try:
+            await issuer.cancel_card(card_id)
+        except Exception:
+            self.cancel_failures += 1
+            await self._set_status(card_id, "discard")
+            raise
+        await self._set_status(card_id, "canceled")
+
+    async def _set_status(self, card_id: str, status: str) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(CardPoolEntry).where(CardPoolEntry.card_id == card_id).values(status=status))
+            await db.commit()
+
+    async def _record_miss(self, cardholder_id: str, currency: str) -> None:
+        async with AsyncSessionLocal() as db:
+            db.add(CardPoolEntry(
+                cardholder_id=cardholder_id,
+                currency=currency,
+                status="missed",
+                claimed_at=datetime.utcnow(),
+            ))
+            await db.commit()
+
+    async def replenish(self) -> None:
+        if not self.enabled or self.issuer is None:
+            return
+        start = time.perf_counter()
+        currency = settings.CARD_POOL_CURRENCY
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.CARD_POOL_ACTIVE_SECONDS)
+        async with AsyncSessionLocal() as db:
+            active = (await db.scalars(
+                select(CardPoolEntry.cardholder_id)
+                .where(CardPoolEntry.claimed_at >= cutoff, CardPoolEntry.currency == currency)
+                .distinct()
+            )).all()
+            available = dict((await db.execute(
+                select(CardPoolEntry.cardholder_id, func.count())
+                .where(CardPoolEntry.status == "available", CardPoolEntry.currency == currency)
+                .group_by(CardPoolEntry.cardholder_id)
+            )).all())
+        self.active_cardholders = len(active)
+        self.available = sum(available.values())
+
+        # Every cardholder's first missing card before anyone's second
+        orders = sorted(
+            (slot, cardholder_id)
+            for cardholder_id in active
+            for slot in range(available.get(cardholder_id, 0), settings.CARD_POOL_SIZE)
+        )[:settings.CARD_POOL_REPLENISH_MAX_PER_RUN]
+        if orders:
+            await self._issue([cardholder_id for _, cardholder_id in orders], currency)
+        await self._retire(cutoff)
+        await self._prune(cutoff)
+        self.replenish_duration.observe(time.perf_counter() - start)
+
+    async def _issue(self, cardholder_ids: List[str], currency: str) -> None:
+        semaphore = asyncio.Semaphore(settings.CARD_POOL_REPLENISH_CONCURRENCY)
+
+        async def issue(cardholder_id: str):
+            async with semaphore:
+                return await self.issuer.create_pool_card(cardholder_id, currency)
+
+        results = await asyncio.gather(
+            *(issue(cardholder_id) for cardholder_id in cardholder_ids), return_exceptions=True)
+
+        entries = []
+        for cardholder_id, result in zip(cardholder_ids, results):
+            if isinstance(result, Exception):
+                self.issue_failures += 1
+                logger.warning("Issuing pool card for cardholder %s failed: %s", cardholder_id, result)
+                continue
+            entries.append(CardPoolEntry(
+                cardholder_id=cardholder_id, card_id=result.id, currency=currency, status="available"))
+        if not entries:
+            return
+        async with AsyncSessionLocal() as db:
+            db.add_all(entries)
+            await db.commit()
+        self.cards_issued += len(entries)
+        self.available += len(entries)
+
+    async def _retire(self, cutoff: datetime) -> None:
+        """
+        Cancel the pooled cards of cardholders with no checkout in the
+        activity window, plus any card a checkout could not cancel. Cards are
+        flagged ``discard`` first so no checkout can claim them mid-cancel,
+        and their rows are deleted once the issuer confirms.
+        """
+        limit = settings.CARD_POOL_REPLENISH_MAX_PER_RUN
+        async with AsyncSessionLocal() as db:
+            active = select(CardPoolEntry.cardholder_id).where(CardPoolEntry.claimed_at >= cutoff)
+            stale = (
+                select(CardPoolEntry.id)
+                .where(CardPoolEntry.status == "available",
+                       CardPoolEntry.cardholder_id.not_in(active))
+                .limit(limit)
+                .scalar_subquery()
+            )
+            await db.execute(
+                update(CardPoolEntry)
+                .where(CardPoolEntry.id.in_(stale), CardPoolEntry.status == "available")
+                .values(status="discard"))
+            card_ids = (await db.scalars(
+                select(CardPoolEntry.card_id).where(CardPoolEntry.status == "discard").limit(limit)
+            )).all()
+            await db.commit()
+        if not card_ids:
+            return
+
+        semaphore = asyncio.Semaphore(settings.CARD_POOL_REPLENISH_CONCURRENCY)
+
+        async def cancel(card_id: str):
+            async with semaphore:
+                return await self.issuer.cancel_card(card_id)
+
+        results = await asyncio.gather(*(cancel(card_id) for card_id in card_ids), return_exceptions=True)
+        cancelled = []
+        for card_id, result in zip(card_ids, results):
+            if isinstance(result, Exception):
+                self.cancel_failures += 1
+                logger.warning("Cancelling pool card %s failed: %s", card_id, result)
+            else:
+                cancelled.append(card_id)
+        if cancelled:
+            async with AsyncSessionLocal() as db:
+                await db.execute(delete(CardPoolEntry).where(CardPoolEntry.card_id.in_(cancelled)))
+                await db.commit()
+        self.cards_retired += len(cancelled)
+
+    async def _prune(self, cutoff: datetime) -> None:
+        """Drop checkout rows that have aged out of the activity window."""
+        while True:
+            async with AsyncSessionLocal() as db:
+                expired_ids = (
+                    select(CardPoolEntry.id)
+                    .where(CardPoolEntry.status.in_(("claimed", "missed", "canceled")),
+                           CardPoolEntry.claimed_at < cutoff)
+                    .limit(settings.CARD_POOL_PRUNE_BATCH_SIZE)
+                    .scalar_subquery()
+                )
+                result = await db.execute(delete(CardPoolEntry).where(CardPoolEntry.id.in_(expired_ids)))
+                await db.commit()
+            self.rows_pruned += result.rowcount
+            if result.rowcount < settings.CARD_POOL_PRUNE_BATCH_SIZE:
+                return
+
+    def stats(self) -> dict:
+        checkouts = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / checkouts, 4) if checkouts else 0.0,
+            "activation_failures": self.activation_failures,
+            "cards_retired": self.cards_retired,
+            "cancel_failures": self.cancel_failures,
+            "cards_issued": self.cards_issued,
+            "issue_failures": self.issue_failures,
+            "available": self.available,
+            "active_cardholders": self.active_cardholders,
+            "rows_pruned": self.rows_pruned,
+            "hit_latency": self.hit_latency.as_dict(),
+            "replenish": self.replenish_duration.as_dict(),
+        }
+
+
+card_pool = CardPool()
+card_pool_replenisher = PeriodicTask(
+    "card-pool-replenisher", settings.CARD_POOL_REPLENISH_SECONDS, card_pool.replenish)
+metrics.register("card_pool", card_pool.stats)
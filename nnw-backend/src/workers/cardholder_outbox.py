@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from models.cardholder import Cardholder
+from models.cardholder_outbox import CardholderOutbox
+from integration.card.cardholder import AsyncCardholderIssuer
+from workers.periodic import PeriodicTask
+
+logger = logging.getLogger(__name__)
+
+
+def idempotency_key(row: CardholderOutbox) -> str:
+    # Stable across retries of the row, so a retry after a lost response or
+    # a failed commit gets the cardholder already created instead of a second one
+    return f"cardholder-outbox-{row.id}"
+
+
+class CardholderOutboxWorker:
+    """
+    Drains the cardholder outbox in batches.
+
+    A batch is claimed by pushing ``next_attempt_at`` out by a lease and
+    committing, so no DB connection is held while the issuer is called; a
+    worker that dies mid-batch simply lets the lease lapse. Every issuer call
+    carries an idempotency key derived from the row, and each row's outcome
+    is committed separately. Failures are retried with exponential backoff
+    until the attempt budget is spent.
+    """
+
+    def __init__(self):
+        # Set at startup to the app's shared issuer
+        self.issuer: Optional[AsyncCardholderIssuer] = None
+        self.provisioned = 0
+        self.retries = 0
+        self.failed = 0
+        self.batch_latency = metrics.LatencyRecorder()
+
+    async def drain(self) -> None:
+        while True:
+            start = time.perf_counter()
+            drained = await self.drain_batch()
+            if drained < settings.CARDHOLDER_OUTBOX_BATCH_SIZE:
+                return
+            # Keep large backlogs (e.g. bulk imports) under the issuer's rate limit
+            if settings.CARDHOLDER_OUTBOX_MAX_PER_SECOND > 0:
+                budget = drained / settings.CARDHOLDER_OUTBOX_MAX_PER_SECOND
+                await asyncio.sleep(max(budget - (time.perf_counter() - start), 0))
+
+    async def drain_batch(self) -> int:
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(CardholderOutbox)
+                .where(CardholderOutbox.status == "pending",
+                       CardholderOutbox.next_attempt_at <= now)
+                .order_by(CardholderOutbox.id)
+                .limit(settings.CARDHOLDER_OUTBOX_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not rows:
+                return 0
+            lease_until = now + timedelta(seconds=settings.CARDHOLDER_OUTBOX_LEASE_SECONDS)
+            for row in rows:
+                row.next_attempt_at = lease_until
+            await db.commit()
+
+        results = await asyncio.gather(
+            *(self.issuer.create_cardholder(
+                name=row.name,
+                email=row.email,
+                phone_number=row.phone_number,
+                address=row.address,
+                idempotency_key=idempotency_key(row),
+            ) for row in rows),
+            return_exceptions=True,
+        )
+
+        # Each outcome commits on its own, so one bad row cannot roll back
+        # cardholders the issuer has already created for the others
+        for row, result in zip(rows, results):
+            if isinstance(result, Exception):
+                await self._schedule_retry(row, result)
+            else:
+                await self._record(row, result["id"])
+        self.batch_latency.observe(time.perf_counter() - start)
+        return len(rows)
+
+    async def _record(self, row: CardholderOutbox, cardholder_id: str) -> None:
+        try:
+            async with AsyncSessionLocal() as db:
+                db.add(Cardholder(
+                    user_id=row.user_id,
+                    cardholder_id=cardholder_id,
+                    provider="stripe",
+                ))
+                await db.execute(
+                    update(CardholderOutbox)
+                    .where(CardholderOutbox.id == row.id)
+                    .values(status="done", last_error=None))
+                await db.commit()
+        except IntegrityError as e:
+            await self._schedule_retry(row, e)
+            return
+        self.provisioned += 1
+
+    async def _schedule_retry(self, row: CardholderOutbox, error: Exception) -> None:
+        attempts = row.attempts + 1
+        values = {"attempts": attempts, "last_error": str(error)[:500]}
+        if attempts >= settings.CARDHOLDER_OUTBOX_MAX_ATTEMPTS:
+            values["status"] = "failed"
+            self.failed += 1
+            logger.error("Giving up provisioning cardholder for user %s: %s", row.user_id, error)
+        else:
+            backoff = min(settings.CARDHOLDER_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                          settings.CARDHOLDER_OUTBOX_BACKOFF_MAX_SECONDS)
+            values["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=backoff)
+            self.retries += 1
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(CardholderOutbox).where(CardholderOutbox.id == row.id).values(**values))
+            await db.commit()
+
+    def stats(self) -> dict:
+        return {
+            "provisioned": self.provisioned,
+            "retries": self.retries,
+            "failed": self.failed,
+            "batch": self.batch_latency.as_dict(),
+        }
+
+
+cardholder_outbox_worker = CardholderOutboxWorker()
+cardholder_outbox_task = PeriodicTask(
+    "cardholder-outbox", settings.CARDHOLDER_OUTBOX_POLL_SECONDS, cardholder_outbox_worker.drain)
+metrics.register("cardholder_outbox", cardholder_outbox_worker.stats)
@@ -0,0 +1,40 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs an async callable every ``interval`` seconds on the event loop until
+    stopped. Failures are logged and the loop carries on with the next tick.
+    """
+
+    def __init__(self, name: str, interval: float, fn: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval = interval
+        self.fn = fn
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.fn()
+            except Exception:
+                logger.exception("Periodic task %s failed", self.name)
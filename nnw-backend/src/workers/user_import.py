@@ -0,0 +1,222 @@
+"""
+Bulk user import for partner onboarding.
+
+Rows are streamed from a CSV or NDJSON file and validated with the
+``UserRegistration`` schema. Each batch has its passwords hashed across the
+hashing process pool, then its users, profiles and cardholder outbox rows are
+written with multi-row inserts in one transaction together with the job's
+progress. Cardholders are provisioned afterwards by the throttled outbox
+worker. Rejected rows are appended to an NDJSON rejects file once their batch
+has committed, so a retried batch does not write them twice.
+
+A job is claimed before it runs. Every batch commit bumps its ``updated_at``
+(the mapper's version column), so a ``running`` job left untouched for
+``USER_IMPORT_LEASE_SECONDS`` belongs to a worker that died and can be claimed
+again; the old worker, if it was only slow, fails its next commit and stops.
+"""
+import asyncio
+import csv
+import json
+import logging
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import Iterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm.exc import StaleDataError
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from models.cardholder_outbox import CardholderOutbox
+from models.profile import Profile
+from models.user import User
+from models.user_import_job import UserImportJob
+from routers.auth import UserRegistration
+from security.passwords import password_hasher
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+_stats = {"jobs_started": 0, "rows_imported": 0, "rows_rejected": 0}
+
+
+def detect_format(filename: str) -> str:
+    suffix = Path(filename).suffix.lower().lstrip(".")
+    return "ndjson" if suffix in ("ndjson", "jsonl") else "csv"
+
+
+def iter_rows(path: str, fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Yield ``(row_number, row)`` pairs, numbering data rows from 1. Rows that
+    cannot be decoded are yielded as the raw line so they can be rejected.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from enumerate(csv.DictReader(f), start=1)
+            return
+        number = 0
+        for line in f:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError:
+                yield number, line.rstrip("\n")
+
+
+class ImportJobBusy(Exception):
+    pass
+
+
+def _reject(rejects: List[str], row_number: int, row, reason: str) -> None:
+    if isinstance(row, dict):
+        row = {key: value for key, value in row.items() if key != "password"}
+    rejects.append(json.dumps({"row": row_number, "error": reason, "data": row}, default=str) + "\n")
+
+
+async def create_job(source_path: str, fmt: str) -> UserImportJob:
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    async with AsyncSessionLocal() as db:
+        job = UserImportJob(
+            source_path=source_path,
+            format=fmt,
+            rejects_path=f"{source_path}.rejects.ndjson",
+        )
+        db.add(job)
+        await db.commit()
+        return job
+
+
+async def claim_job(job_id: int) -> UserImportJob:
+    """
+    Mark a job running for the caller, who then runs it with run_import().
+    Raises ImportJobBusy if it is completed or another worker holds it.
+    """
+    now = datetime.utcnow()
+    abandoned = now - timedelta(seconds=settings.USER_IMPORT_LEASE_SECONDS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(UserImportJob)
+            .where(UserImportJob.id == job_id,
+                   or_(UserImportJob.status.in_(("pending", "failed")),
+                       and_(UserImportJob.status == "running", UserImportJob.updated_at < abandoned)))
+            .values(status="running", error=None, updated_at=now)
+        )
+        await db.commit()
+        job = await db.get(UserImportJob, job_id)
+    if job is None:
+        raise ValueError(f"Import job {job_id} not found")
+    if result.rowcount == 0:
+        raise ImportJobBusy(f"Import job {job_id} is {job.status}")
+    return job
+
+
+async def _import_batch(db, job: UserImportJob, batch: List[Tuple[int, object]], rejects: List[str]) -> None:
+    valid = {}
+    for row_number, row in batch:
+        if not isinstance(row, dict):
+            _reject(rejects, row_number, row, "Row is not a JSON object")
+            continue
+        try:
+            registration = UserRegistration.model_validate(row)
+        except ValidationError as e:
+            _reject(rejects, row_number, row, str(e))
+            continue
+        if registration.email in valid:
+            _reject(rejects, row_number, row, "Duplicate email in import")
+            continue
+        valid[registration.email] = (row_number, row, registration)
+
+    if valid:
+        existing = set(await db.scalars(select(User.email).where(User.email.in_(list(valid)))))
+        for email in existing:
+            row_number, row, _ = valid.pop(email)
+            _reject(rejects, row_number, row, "Email already registered")
+
+    registrations = [registration for _, _, registration in valid.values()]
+    if registrations:
+        hashed = await password_hasher.hash_many([r.password for r in registrations])
+        user_ids = {
+            email: user_id
+            for user_id, email in await db.execute(
+                insert(User).returning(User.id, User.email),
+                [{"email": r.email, "hashed_password": h} for r, h in zip(registrations, hashed)],
+            )
+        }
+        await db.execute(insert(Profile), [{
+            "user_id": user_ids[r.email],
+            "name": r.name,
+            "mobile": r.mobile,
+            "dob": r.dob,
+            "address": r.address,
+            "job_title": r.job_title,
+            "monthly_income": r.monthly_income,
+            "monthly_expenses": r.monthly_expenses,
+        } for r in registrations])
+        await db.execute(insert(CardholderOutbox), [{
+            "user_id": user_ids[r.email],
+            "name": r.name,
+            "email": r.email,
+            "phone_number": r.mobile,
+            "address": r.address,
+        } for r in registrations])
+
+    job.rows_processed = batch[-1][0]
+    job.imported += len(registrations)
+    job.rejected += len(batch) - len(registrations)
+    _stats["rows_imported"] += len(registrations)
+    _stats["rows_rejected"] += len(batch) - len(registrations)
+
+
+async def run_import(job_id: int) -> UserImportJob:
+    """
+    Run (or resume) a job claimed with claim_job(), committing progress after
+    every batch.
+    """
+    _stats["jobs_started"] += 1
+    async with AsyncSessionLocal() as db:
+        job = await db.get(UserImportJob, job_id)
+        if job is None:
+            raise ValueError(f"Import job {job_id} not found")
+
+        try:
+            rows = iter_rows(job.source_path, job.format)
+            # Skip everything already committed by a previous run
+            rows = (item for item in rows if item[0] > job.rows_processed)
+            with open(job.rejects_path, "a", encoding="utf-8") as rejects_file:
+                while batch := list(islice(rows, settings.USER_IMPORT_BATCH_SIZE)):
+                    rejects = []
+                    await _import_batch(db, job, batch, rejects)
+                    await db.commit()
+                    rejects_file.writelines(rejects)
+                    rejects_file.flush()
+                    logger.info("Import job %s: %s rows processed, %s imported, %s rejected",
+                                job.id, job.rows_processed, job.imported, job.rejected)
+                    # Let request handlers run between batches
+                    await asyncio.sleep(0)
+        except StaleDataError:
+            # The lease lapsed and another worker claimed the job
+            await db.rollback()
+            logger.warning("Import job %s was taken over by another worker", job_id)
+            return await db.get(UserImportJob, job_id)
+        except Exception as e:
+            await db.rollback()
+            job = await db.get(UserImportJob, job_id)
+            job.status = "failed"
+            job.error = str(e)[:500]
+            await db.commit()
+            logger.exception("Import job %s failed", job.id)
+            return job
+
+        job.status = "completed"
+        await db.commit()
+        return job
+
+
+metrics.register("user_import", lambda: dict(_stats))
@@ -0,0 +1,143 @@
+"""
+Remembers which Stripe events have been handled, so redeliveries are
+skipped before any outbound call.
+
+Handled ids live in the unique-keyed ``processed_events`` table, written in
+the same transaction that removes the event from the webhook queue, with a
+bounded in-process LRU of recent ids in front of it. The listener checks the
+LRU alone and acks a known redelivery without queueing it; the worker checks
+the LRU and then the table before handling a batch. Ids are kept for
+``WEBHOOK_DEDUPE_RETENTION_SECONDS``, past Stripe's redelivery window, and
+older rows are pruned in bounded batches.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Iterable, List, Set, Tuple
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal, engine
+from models.processed_event import ProcessedEvent
+from workers.periodic import PeriodicTask
+
+
+class WebhookDedupe:
+    def __init__(self, max_entries: int, retention_seconds: float):
+        self.max_entries = max_entries
+        self.retention_seconds = retention_seconds
+        # event id -> time.monotonic() when it was handled
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self.unique = 0
+        self.duplicates_at_ingress = 0
+        self.duplicates_in_queue = 0
+        self.lru_hits = 0
+        self.table_hits = 0
+        self.rows_pruned = 0
+        self.prune_duration = metrics.LatencyRecorder()
+
+    def seen_recently(self, event_id: str) -> bool:
+        """LRU-only check for the listener; counts a hit as a duplicate."""
+        if self._lookup(event_id):
+            self.duplicates_at_ingress += 1
+            return True
+        return False
+
+    async def processed_ids(self, db: AsyncSession, event_ids: Iterable[str]) -> Set[str]:
+        """The ids among ``event_ids`` that have already been handled."""
+        event_ids = set(event_ids)
+        processed = {event_id for event_id in event_ids if self._lookup(event_id)}
+        self.lru_hits += len(processed)
+        remaining = event_ids - processed
+        if remaining:
+            found = set((await db.scalars(
+                select(ProcessedEvent.event_id).where(ProcessedEvent.event_id.in_(remaining))
+            )).all())
+            self.table_hits += len(found)
+            self.remember(found)
+            processed |= found
+        return processed
+
+    def record_duplicates(self, count: int) -> None:
+        self.duplicates_in_queue += count
+
+    async def mark_processed(self, db: AsyncSession, events: List[Tuple[str, str]]) -> None:
+        """
+        Record handled (event_id, event_type) pairs; the caller commits, then
+        calls remember().
+        """
+        if not events:
+            return
+        insert = postgresql.insert if engine.dialect.name == "postgresql" else sqlite.insert
+        now = datetime.utcnow()
+        await db.execute(
+            insert(ProcessedEvent).on_conflict_do_nothing(index_elements=[ProcessedEvent.event_id]),
+            [{"event_id": event_id, "event_type": event_type, "processed_at": now}
+             for event_id, event_type in events],
+        )
+        self.unique += len(events)
+
+    def remember(self, event_ids: Iterable[str]) -> None:
+        now = time.monotonic()
+        for event_id in event_ids:
+            self._recent[event_id] = now
+            self._recent.move_to_end(event_id)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def _lookup(self, event_id: str) -> bool:
+        processed_at = self._recent.get(event_id)
+        if processed_at is None:
+            return False
+        if time.monotonic() - processed_at > self.retention_seconds:
+            del self._recent[event_id]
+            return False
+        self._recent.move_to_end(event_id)
+        return True
+
+    async def prune(self) -> None:
+        start = time.perf_counter()
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        for _ in range(settings.WEBHOOK_DEDUPE_PRUNE_MAX_BATCHES):
+            async with AsyncSessionLocal() as db:
+                expired_ids = (
+                    select(ProcessedEvent.event_id)
+                    .where(ProcessedEvent.processed_at < cutoff)
+                    .limit(settings.WEBHOOK_DEDUPE_PRUNE_BATCH_SIZE)
+                    .scalar_subquery()
+                )
+                result = await db.execute(
+                    delete(ProcessedEvent).where(ProcessedEvent.event_id.in_(expired_ids)))
+                await db.commit()
+            self.rows_pruned += result.rowcount
+            if result.rowcount < settings.WEBHOOK_DEDUPE_PRUNE_BATCH_SIZE:
+                break
+        self.prune_duration.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        duplicates = self.duplicates_at_ingress + self.duplicates_in_queue
+        deliveries = self.unique + duplicates
+        return {
+            "entries": len(self._recent),
+            "unique": self.unique,
+            "duplicates_at_ingress": self.duplicates_at_ingress,
+            "duplicates_in_queue": self.duplicates_in_queue,
+            "duplicate_ratio": round(duplicates / deliveries, 4) if deliveries else 0.0,
+            "lru_hits": self.lru_hits,
+            "table_hits": self.table_hits,
+            "rows_pruned": self.rows_pruned,
+            "prune": self.prune_duration.as_dict(),
+        }
+
+
+webhook_dedupe = WebhookDedupe(
+    max_entries=settings.WEBHOOK_DEDUPE_LRU_SIZE,
+    retention_seconds=settings.WEBHOOK_DEDUPE_RETENTION_SECONDS,
+)
+webhook_dedupe_pruner = PeriodicTask(
+    "webhook-dedupe-prune", settings.WEBHOOK_DEDUPE_PRUNE_SECONDS, webhook_dedupe.prune)
+metrics.register("webhook_dedupe", webhook_dedupe.stats)
@@ -0,0 +1,190 @@
+"""
+Handles queued Stripe webhook events off the request path.
+
+The listener only verifies the signature and inserts a ``WebhookEvent`` row,
+so Stripe gets its ack without waiting on any outbound call. This worker
+claims due events in batches the same way the cardholder outbox does (push
+``next_attempt_at`` out by a lease and commit, then call out with no DB
+connection held), skips events that were already handled (see
+workers/webhook_dedupe.py), handles up to ``WEBHOOK_CONCURRENCY`` of the rest
+at once and deletes each row once handled. Failures back off exponentially;
+an event that exhausts ``WEBHOOK_MAX_ATTEMPTS`` is left in the table as
+``failed``.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import delete, func, select
+
+import metrics
+from config import settings
+from models import AsyncSessionLocal
+from models.webhook_event import WebhookEvent
+from integration.card.card_issuer import AsyncCardIssuer
+from workers.periodic import PeriodicTask
+from workers.webhook_dedupe import webhook_dedupe
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookEventWorker:
+    def __init__(self):
+        # Set at startup to the app's shared issuer
+        self.issuer: Optional[AsyncCardIssuer] = None
+        self.handlers: Dict[str, Callable[[dict], Awaitable[None]]] = {
+            "issuing.authorization.created": self._cancel_used_card,
+        }
+        self.received = 0
+        self.ignored = 0
+        self.processed = 0
+        self.retries = 0
+        self.failed = 0
+        self.backlog = 0
+        self.oldest_pending_seconds = 0.0
+        self.throughput = 0.0
+        self.batch_latency = metrics.LatencyRecorder()
+        # Receipt to handled, per event
+        self.lag = metrics.LatencyRecorder()
+
+    def handles(self, event_type: str) -> bool:
+        return event_type in self.handlers
+
+    def record_received(self, handled: bool) -> None:
+        if handled:
+            self.received += 1
+        else:
+            self.ignored += 1
+
+    async def drain(self) -> None:
+        start = time.perf_counter()
+        handled = 0
+        while True:
+            batch = await self.drain_batch()
+            handled += batch
+            if batch < settings.WEBHOOK_BATCH_SIZE:
+                break
+        elapsed = time.perf_counter() - start
+        if handled:
+            self.throughput = handled / elapsed
+        await self._measure_backlog()
+
+    async def drain_batch(self) -> int:
+        start = time.perf_counter()
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            rows = (await db.scalars(
+                select(WebhookEvent)
+                .where(WebhookEvent.status == "pending",
+                       WebhookEvent.next_attempt_at <= now)
+                .order_by(WebhookEvent.id)
+                .limit(settings.WEBHOOK_BATCH_SIZE)
+                .with_for_update(skip_locked=True)
+            )).all()
+            if not rows:
+                return 0
+            # Redeliveries of handled events are dropped before any outbound
+            # call; looked up inside the claim so the commit below ends the
+            # transaction before anything is called
+            processed = await webhook_dedupe.processed_ids(db, {row.event_id for row in rows})
+            lease_until = now + timedelta(seconds=settings.WEBHOOK_LEASE_SECONDS)
+            for row in rows:
+                row.next_attempt_at = lease_until
+            await db.commit()
+
+        # A second copy of an event within this batch follows the first
+        duplicate_ids = [row.id for row in rows if row.event_id in processed]
+        to_handle = {}
+        repeats = []
+        for row in rows:
+            if row.event_id in processed:
+                continue
+            if row.event_id in to_handle:
+                repeats.append(row)
+            else:
+                to_handle[row.event_id] = row
+
+        semaphore = asyncio.Semaphore(settings.WEBHOOK_CONCURRENCY)
+
+        async def handle(row: WebhookEvent) -> None:
+            async with semaphore:
+                await self.handlers[row.event_type](json.loads(row.payload))
+
+        handling = list(to_handle.values())
+        results = await asyncio.gather(*(handle(row) for row in handling), return_exceptions=True)
+
+        async with AsyncSessionLocal() as db:
+            done = []
+            handled_at = datetime.utcnow()
+            for row, result in zip(handling, results):
+                if isinstance(result, Exception):
+                    db.add(row)
+                    self._schedule_retry(row, result)
+                    continue
+                done.append(row)
+                self.lag.observe((handled_at - row.received_at).total_seconds())
+            done_event_ids = {row.event_id for row in done}
+            # A repeat whose first copy failed waits out its lease and is retried
+            duplicate_ids += [row.id for row in repeats if row.event_id in done_event_ids]
+            done_ids = [row.id for row in done]
+            await webhook_dedupe.mark_processed(db, [(row.event_id, row.event_type) for row in done])
+            if done_ids or duplicate_ids:
+                await db.execute(delete(WebhookEvent).where(WebhookEvent.id.in_(done_ids + duplicate_ids)))
+            await db.commit()
+        webhook_dedupe.remember(done_event_ids)
+        webhook_dedupe.record_duplicates(len(duplicate_ids))
+        self.processed += len(done_ids)
+        self.batch_latency.observe(time.perf_counter() - start)
+        return len(rows)
+
+    def _schedule_retry(self, row: WebhookEvent, error: Exception) -> None:
+        row.attempts += 1
+        row.last_error = str(error)[:500]
+        if row.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            row.status = "failed"
+            self.failed += 1
+            logger.error("Giving up on webhook event %s (%s): %s", row.event_id, row.event_type, error)
+            return
+        backoff = min(settings.WEBHOOK_BACKOFF_SECONDS * 2 ** (row.attempts - 1),
+                      settings.WEBHOOK_BACKOFF_MAX_SECONDS)
+        row.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff)
+        self.retries += 1
+
+    async def _measure_backlog(self) -> None:
+        async with AsyncSessionLocal() as db:
+            backlog, oldest = (await db.execute(
+                select(func.count(), func.min(WebhookEvent.received_at))
+                .where(WebhookEvent.status == "pending")
+            )).one()
+        self.backlog = backlog
+        self.oldest_pending_seconds = (
+            (datetime.utcnow() - oldest).total_seconds() if oldest is not None else 0.0)
+
+    async def _cancel_used_card(self, event: dict) -> None:
+        # For a one-time card, an authorization means it has been used
+        card_id = (event["data"]["object"].get("card") or {}).get("id")
+        if card_id:
+            await self.issuer.cancel_card(card_id)
+
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "ignored": self.ignored,
+            "processed": self.processed,
+            "retries": self.retries,
+            "failed": self.failed,
+            "backlog": self.backlog,
+            "oldest_pending_seconds": round(self.oldest_pending_seconds, 3),
+            "throughput_per_second": round(self.throughput, 2),
+            "lag": self.lag.as_dict(),
+            "batch": self.batch_latency.as_dict(),
+        }
+
+
+webhook_event_worker = WebhookEventWorker()
+webhook_event_task = PeriodicTask(
+    "webhook-events", settings.WEBHOOK_POLL_SECONDS, webhook_event_worker.drain)
+metrics.register("webhook_events", webhook_event_worker.stats)